@@ -1,4 +1,9 @@
-from genes import Genome
+from genes import Genome, register_genes
+from compact import precision_for_scale
+from instrument import instrumented
+from part_cache import cached_group
+from paths import Path
+from raster import shape
 
 
 # =====================================================
@@ -40,6 +45,9 @@ from genes import Genome
 NUM_SEGS      = 3
 TENSION_RATIO = 0.25   # same convention as TenderEyes
 
+# Genes 96–109 (see the SEGMENTED EYEBROW GENES block in genes.py)
+BROW_GENES = register_genes("brows", range(96, 110))
+
 CENTER_DY_RANGES = [
     (-0.14,  0.00),   # seg 0: inner portion — mostly rises
     (-0.04,  0.05),   # seg 1: arch peak region — can go either way
@@ -105,11 +113,11 @@ class TenderBrows:
     # PATH BUILDING
     # =====================================================
 
-    def generate_group(self):
+    def _outline(self):
         """
-        Returns SVG markup for one eyebrow (filled shape + hidden ctrl-points group)
-        in normalised (0–1) space.
-        The caller (TenderFace.py) applies translate / scale / mirror transforms.
+        Center-line keypoints (cx, cy), half-widths hw and the per-segment
+        ((c1x, c1y), (c2x, c2y)) control points of the upper edge, lower
+        edge and center-line.
         """
         dx       = self.compute_dx()
         dy       = self.compute_center_dy()
@@ -123,12 +131,6 @@ class TenderBrows:
             cx.append(cx[-1] + dx[i])
             cy.append(cy[-1] + dy[i])
 
-        # --------------------------------------------------
-        # Filled shape: upper edge (inner→outer) then lower edge (outer→inner)
-        # --------------------------------------------------
-        d = f"M {cx[0]:.4f} {cy[0] - hw[0]:.4f} "
-
-        # Collect control-point coordinates for the visualization group
         cp_upper = []   # list of (c1, c2) tuples per segment, upper edge
         cp_lower = []   # same for lower edge
         cp_center = []  # center-line control points
@@ -148,27 +150,66 @@ class TenderBrows:
             c1y_lo  = c1y_ctr + self._lerp(hw[i], hw[i + 1], 0.25)
             c2y_lo  = c2y_ctr + self._lerp(hw[i], hw[i + 1], 0.75)
 
-            ex = cx[i + 1]
-            ey = cy[i + 1] - hw[i + 1]
-
-            d += f"C {c1x:.4f} {c1y_up:.4f} {c2x:.4f} {c2y_up:.4f} {ex:.4f} {ey:.4f} "
-
             cp_upper.append(((c1x, c1y_up),  (c2x, c2y_up)))
             cp_lower.append(((c1x, c1y_lo),  (c2x, c2y_lo)))
             cp_center.append(((c1x, c1y_ctr), (c2x, c2y_ctr)))
 
+        return cx, cy, hw, cp_upper, cp_lower, cp_center
+
+    def _shape_path(self):
+        """
+        The closed brow outline: upper edge (inner→outer) then lower edge
+        (outer→inner).
+        """
+        cx, cy, hw, cp_upper, cp_lower, _ = self._outline()
+
+        d = Path().move_to(cx[0], cy[0] - hw[0])
+
+        for i in range(NUM_SEGS):
+            (c1x, c1y), (c2x, c2y) = cp_upper[i]
+            d.curve_to(c1x, c1y, c2x, c2y, cx[i + 1], cy[i + 1] - hw[i + 1])
+
         # Lower edge: outer tip → inner (reversed cubics: swap c1↔c2)
         for i in range(NUM_SEGS - 1, -1, -1):
             (lc1x, lc1y), (lc2x, lc2y) = cp_lower[i]
-            ex = cx[i]
-            ey = cy[i] + hw[i]
-            d += f"C {lc2x:.4f} {lc2y:.4f} {lc1x:.4f} {lc1y:.4f} {ex:.4f} {ey:.4f} "
+            d.curve_to(lc2x, lc2y, lc1x, lc1y, cx[i], cy[i] + hw[i])
 
-        d += "Z"
+        return d.close()
+
+    @instrumented("brows.generate_group")
+    @cached_group("brows")
+    def generate_group(self, compact=False, view_scale=1.0, show_points=False):
+        """
+        Returns SVG markup for one eyebrow (filled shape) in normalised
+        (0–1) space.
+        The caller (TenderFace.py) applies translate / scale / mirror transforms.
+
+        compact:     compact markup (see compact.py)
+        view_scale:  face units per normalised unit, sets the compact precision
+        show_points: append the hidden ctrl-points group (generate_points());
+                     ignored when compact
+        """
+        d = self._shape_path()
+
+        if compact:
+            return f'<path class="k" d="{d.to_svg(precision_for_scale(view_scale), compact=True)}"/>'
+
+        cp_svg = "\n" + self.generate_points(hidden=True) if show_points else ""
+        return f'<path d="{d.to_svg()}" fill="black" stroke="none"/>{cp_svg}'
+
+    def shapes(self):
+        """The brow as raster.shape() geometry, in the normalised space of generate_group()."""
+        return [shape([self._shape_path()], fill=(0, 0, 0))]
+
+    def generate_points(self, hidden=False):
+        """
+        The ctrl-points overlay alone: center-line handles (blue) and the
+        keypoints of the center-line and both edges (red), in the same
+        normalised space as generate_group().
+        hidden=True adds style="display:none".
+        """
+        cx, cy, hw, _, _, cp_center = self._outline()
 
-        # --------------------------------------------------
-        # Control-point visualization group
-        # --------------------------------------------------
         r  = 0.025   # dot radius in normalised units
         sw = 0.005   # line stroke-width
 
@@ -179,7 +220,8 @@ class TenderBrows:
             return (f'<line x1="{x1:.4f}" y1="{y1:.4f}" x2="{x2:.4f}" y2="{y2:.4f}"'
                     f' stroke="red" stroke-width="{sw}" stroke-dasharray="0.04 0.02"/>')
 
-        cp_svg = '<g class="ctrl-points" style="display:none">\n'
+        style = ' style="display:none"' if hidden else ''
+        cp_svg = f'<g class="ctrl-points"{style}>\n'
 
         for i in range(NUM_SEGS):
             (c1x, c1y_ctr), (c2x, c2y_ctr) = cp_center[i]
@@ -199,6 +241,4 @@ class TenderBrows:
             if hw[i] > 0:                                 # skip tip (upper == lower)
                 cp_svg += dot(cx[i], cy[i] + hw[i])      # lower edge
 
-        cp_svg += '</g>'
-
-        return f'<path d="{d}" fill="black" stroke="none"/>\n{cp_svg}'
+        return cp_svg + '</g>'
@@ -1,5 +1,12 @@
-from genes import Genome
-
+from contact_sheet import write_svg_grid
+from genes import Genome, register_genes, segment_type_indices, segment_type_table
+from compact import format_number, hex_color, join_numbers, precision_for_scale
+from instrument import instrumented
+from part_cache import cached_group
+from paths import Path
+from raster import circle_outline, shape
+
+import io
 import math
 
 # =====================================================
@@ -42,6 +49,24 @@ SEGMENT_TYPE_WEIGHTS = {
 SEGMENT_TYPES = list(SEGMENT_TYPE_WEIGHTS.keys())
 SEGMENT_WEIGHTS = list(SEGMENT_TYPE_WEIGHTS.values())
 
+# Gene value 0–255 → segment type (and → index into SEGMENT_TYPES),
+# built once so eyelid generation is a plain table lookup.
+SEGMENT_TYPE_TABLE = segment_type_table(SEGMENT_TYPES, SEGMENT_WEIGHTS)
+SEGMENT_TYPE_INDEX_TABLE = segment_type_indices(SEGMENT_WEIGHTS)
+
+
+# -----------------------------------------------------
+# GENES
+# -----------------------------------------------------
+#   0– 7 : Δy per segment (upper 0–3, lower 4–7)
+#   8–23 : Δx, four genes per segment
+#  24–31 : segment types (upper 24–27, lower 28–31)
+#  32–39 : tensions (upper 32–35, lower 36–39)
+#  40–51 : iris color
+#     52 : iris highlight size
+
+EYE_GENES = register_genes("eyes", range(0, 53))
+
 
 # =====================================================
 # DELTA-Y RANGES
@@ -131,6 +156,7 @@ class MinimalEyeGenome:
     # SEGMENT DATA
     # =====================================================
 
+    @instrumented("eyes.build_segments")
     def build_segments(self, dx_list, dy_list, seg_types, tensions, y_start=0.0):
         """
         Compute absolute control point coordinates for each segment.
@@ -193,52 +219,36 @@ class MinimalEyeGenome:
 
     def segments_to_path(self, segments, reverse=False):
         """
-        Serialise a list of segments to an SVG path string.
+        Convert a list of segments to a Path.
 
-        reverse=True traverses the list backwards, reversing each curve so
-        the path runs from the last segment's end point back to the first
-        segment's start point.  Useful for building closed eye shapes.
+        reverse=True returns the path traversed backwards, from the last
+        segment's end point back to the first segment's start point.
+        Useful for building closed eye shapes.
         """
-        if not reverse:
-            d = f"M {segments[0]['x0']:.2f} {segments[0]['y0']:.2f} "
-            for s in segments:
-                if s['cmd'] == 'L':
-                    d += f"L {s['x1']:.2f} {s['y1']:.2f} "
-                elif s['cmd'] == 'C':
-                    c1, c2 = s['c1'], s['c2']
-                    d += f"C {c1[0]:.2f} {c1[1]:.2f} {c2[0]:.2f} {c2[1]:.2f} {s['x1']:.2f} {s['y1']:.2f} "
-                elif s['cmd'] == 'Q':
-                    c = s['c']
-                    d += f"Q {c[0]:.2f} {c[1]:.2f} {s['x1']:.2f} {s['y1']:.2f} "
-        else:
-            d = f"M {segments[-1]['x1']:.2f} {segments[-1]['y1']:.2f} "
-            for s in reversed(segments):
-                if s['cmd'] == 'L':
-                    d += f"L {s['x0']:.2f} {s['y0']:.2f} "
-                elif s['cmd'] == 'C':
-                    # Reverse cubic: swap c1/c2 and swap start/end
-                    c1, c2 = s['c1'], s['c2']
-                    d += f"C {c2[0]:.2f} {c2[1]:.2f} {c1[0]:.2f} {c1[1]:.2f} {s['x0']:.2f} {s['y0']:.2f} "
-                elif s['cmd'] == 'Q':
-                    # Reverse quadratic: same control point, swap start/end
-                    c = s['c']
-                    d += f"Q {c[0]:.2f} {c[1]:.2f} {s['x0']:.2f} {s['y0']:.2f} "
-        return d
-
+        path = Path(precision=2).move_to(segments[0]['x0'], segments[0]['y0'])
+        for s in segments:
+            if s['cmd'] == 'L':
+                path.line_to(s['x1'], s['y1'])
+            elif s['cmd'] == 'C':
+                path.curve_to(*s['c1'], *s['c2'], s['x1'], s['y1'])
+            elif s['cmd'] == 'Q':
+                path.quad_to(*s['c'], s['x1'], s['y1'])
+        return path.reversed() if reverse else path
+
+    @instrumented("eyes.build_closed_eye_path")
     def build_closed_eye_path(self, upper_segs, lower_segs):
         """
-        Returns a single closed path that outlines the eye opening:
+        Returns a single closed Path that outlines the eye opening:
         upper eyelid forward (left → right) then lower eyelid reversed
         (right → left), closed with Z.
         """
-        upper_fwd = self.segments_to_path(upper_segs, reverse=False)
-        lower_rev = self.segments_to_path(lower_segs, reverse=True)
+        upper_fwd = self.segments_to_path(upper_segs)
 
-        # lower_rev starts with "M ex ey" (same point upper_fwd ends at),
-        # so we strip that "M x y " prefix before appending.
-        lower_commands = " ".join(lower_rev.split()[3:])  # skip "M", x, y
+        # The reversed lower lid starts where the upper lid ends,
+        # so its leading move is dropped.
+        lower_rev = self.segments_to_path(lower_segs, reverse=True).strip_move()
 
-        return upper_fwd + lower_commands + " Z"
+        return (upper_fwd + lower_rev).close()
 
     # =====================================================
     # COLOR UTILITY
@@ -259,30 +269,44 @@ class MinimalEyeGenome:
     # IRIS POLYGON
     # =====================================================
 
-    def build_iris_polygon(self, cx, cy, radius, color):
-        """
-        Creates a light polygon inside the iris for a highlight effect.
-        """
-        points = []
+    def _iris_points(self, cx, cy, radius):
+        """The 12 (x, y) vertices of the iris highlight polygon."""
         sides = 12
         poly_radius = radius * (0.55 + 0.15 * self.genome.get_iris_highlight_multiplier())
 
+        points = []
         for i in range(sides):
             angle = 2 * math.pi * i / sides
-            x = cx + poly_radius * math.cos(angle)
-            y = cy + poly_radius * math.sin(angle)
-            points.append(f"{x:.2f},{y:.2f}")
+            points.append((cx + poly_radius * math.cos(angle), cy + poly_radius * math.sin(angle)))
+        return points
+
+    @instrumented("eyes.build_iris_polygon")
+    def build_iris_polygon(self, cx, cy, radius, color, precision=None):
+        """
+        Creates a light polygon inside the iris for a highlight effect.
+        precision: if given, compact markup with coordinates at that precision.
+        """
+        points = []
+
+        for x, y in self._iris_points(cx, cy, radius):
+            if precision is None:
+                points.append(f"{x:.2f},{y:.2f}")
+            else:
+                points += (format_number(x, precision), format_number(y, precision))
+
+        if precision is not None:
+            return f'<polygon points="{join_numbers(points)}" fill="{hex_color(color)}"/>'
 
         return f"""
 <polygon points="{' '.join(points)}"
          fill="rgb{color}"/>
 """
 
-    # -------------------------------------------------
-    # RETURNS ONLY THE GROUP CONTENT
-    # -------------------------------------------------
-
-    def generate_group(self, clip_id, normalize=False):
+    def _geometry(self, normalize=False):
+        """
+        Eyelid, fold and eye-opening Paths plus the iris placement, in
+        pixel or (normalize=True) unit-width space.
+        """
 
         dx_list = self.compute_dx()
         upper_dy, lower_dy = self.compute_dy()
@@ -306,11 +330,11 @@ class MinimalEyeGenome:
 
         # Segment types and tensions from genes
         upper_seg_type = [
-            self.genome.get_segment_type(i, SEGMENT_TYPES, SEGMENT_WEIGHTS, upper=True)
+            self.genome.lookup_segment_type(i, SEGMENT_TYPE_TABLE, upper=True)
             for i in range(4)
         ]
         lower_seg_type = [
-            self.genome.get_segment_type(i, SEGMENT_TYPES, SEGMENT_WEIGHTS, upper=False)
+            self.genome.lookup_segment_type(i, SEGMENT_TYPE_TABLE, upper=False)
             for i in range(4)
         ]
         upper_tension = [self.genome.get_tension(i, upper=True)  for i in range(4)]
@@ -353,15 +377,67 @@ class MinimalEyeGenome:
         iris_center_x = sum(dx_list) / 2
         iris_center_y = (sum(upper_dy[0:3]) + sum(lower_dy[0:3])) / 2
 
+        return dict(
+            upper=upper_path, lower=lower_path, fold=fold_path, shape=eye_shape,
+            iris_x=iris_center_x, iris_y=iris_center_y,
+            radius_scale=radius_scale, stroke_width=stroke_width,
+        )
+
+
+    # -------------------------------------------------
+    # RETURNS ONLY THE GROUP CONTENT
+    # -------------------------------------------------
+
+    @instrumented("eyes.generate_group")
+    @cached_group("eyes", settings=("stroke_ratio",))
+    def generate_group(self, clip_id, normalize=False, compact=False, view_scale=1.0):
+        """
+        compact:    compact markup (see compact.py); needs COMPACT_STYLE in
+                    the enclosing document
+        view_scale: face units per unit of this group, sets the compact
+                    precision
+        """
+
+        g = self._geometry(normalize)
+        radius_scale = g['radius_scale']
+        stroke_width = g['stroke_width']
+
+        precision = precision_for_scale(view_scale) if compact else None
+
+        # Individual stroke paths (for drawing the eyelid lines)
+        upper_path = g['upper'].to_svg(precision, compact)
+        lower_path = g['lower'].to_svg(precision, compact)
+        fold_path  = g['fold'].to_svg(precision, compact)
+
+        # Closed eye-opening shape (used for clip + sclera fill)
+        eye_shape = g['shape'].to_svg(precision, compact)
+
+        iris_center_x, iris_center_y = g['iris_x'], g['iris_y']
+
         base_color      = self.genome.get_iris_color()
         highlight_color = self.genome.get_iris_highlight_color()
 
         iris_polygon = self.build_iris_polygon(
             iris_center_x, iris_center_y,
             IRIS_RADIUS * radius_scale,
-            highlight_color
+            highlight_color,
+            precision
         )
 
+        if compact:
+            f = lambda v: format_number(v, precision)
+            cx, cy = f(iris_center_x), f(iris_center_y)
+            return (f'<defs><clipPath id="{clip_id}"><path d="{eye_shape}"/></clipPath></defs>'
+                    f'<path class="w" d="{eye_shape}"/>'
+                    f'<g clip-path="url(#{clip_id})">'
+                    f'<circle cx="{cx}" cy="{cy}" r="{f(IRIS_RADIUS * radius_scale)}" fill="{hex_color(base_color)}"/>'
+                    f'{iris_polygon}'
+                    f'<circle class="k" cx="{cx}" cy="{cy}" r="{f(PUPIL_RADIUS * radius_scale)}"/>'
+                    f'</g>'
+                    f'<g class="l" stroke-width="{format_number(stroke_width, precision + 1)}">'
+                    f'<path d="{upper_path}"/><path d="{fold_path}"/><path d="{lower_path}"/>'
+                    f'</g>')
+
         return f"""
 <defs>
   <clipPath id="{clip_id}" clipPathUnits="userSpaceOnUse">
@@ -394,44 +470,52 @@ class MinimalEyeGenome:
 <path d="{lower_path}" fill="none" stroke="black" stroke-width="{stroke_width}"/>
 """
 
+    def shapes(self, normalize=False):
+        """
+        The eye as raster.shape() geometry, in the same space as
+        generate_group(normalize=...): sclera, then iris, highlight and
+        pupil clipped to the eye opening, then the eyelid and fold lines.
+        """
+        g = self._geometry(normalize)
+        cx, cy, radius_scale = g['iris_x'], g['iris_y'], g['radius_scale']
+        clip = [g['shape']]
+
+        return [
+            shape(clip, fill=(255, 255, 255)),
+            shape([circle_outline(cx, cy, IRIS_RADIUS * radius_scale)],
+                  fill=self.genome.get_iris_color(), clip=clip),
+            shape([self._iris_points(cx, cy, IRIS_RADIUS * radius_scale)],
+                  fill=self.genome.get_iris_highlight_color(), clip=clip),
+            shape([circle_outline(cx, cy, PUPIL_RADIUS * radius_scale)], fill=(0, 0, 0), clip=clip),
+            shape([g['upper'], g['fold'], g['lower']], stroke=(0, 0, 0),
+                  stroke_width=g['stroke_width']),
+        ]
+
+
 # =====================================================
-# 4x4 GRID
+# GRID
 # =====================================================
 
-def generate_eye_grid():
-
-    COLS = 4
-    ROWS = 4
+def write_eye_grid(out, rows=4, cols=4):
+    """Streams a rows × cols grid of random eyes to the file-like `out`."""
 
     CELL_WIDTH = 200
     CELL_HEIGHT = 100
 
-    total_width = COLS * CELL_WIDTH
-    total_height = ROWS * CELL_HEIGHT
+    cells = (
+        MinimalEyeGenome().generate_group(f"eyeClip_{row}_{col}")
+        for row in range(rows)
+        for col in range(cols)
+    )
 
-    svg_content = ""
+    write_svg_grid(out, cells, rows * cols, cols, CELL_WIDTH, CELL_HEIGHT)
 
-    for row in range(ROWS):
-        for col in range(COLS):
 
-            eye = MinimalEyeGenome()
-            clip_id = f"eyeClip_{row}_{col}"
-
-            tx = col * CELL_WIDTH
-            ty = row * CELL_HEIGHT
-
-            svg_content += f"""
-<g transform="translate({tx},{ty})">
-{eye.generate_group(clip_id)}
-</g>
-"""
-
-    return f"""
-<svg xmlns="http://www.w3.org/2000/svg"
-     viewBox="0 0 {total_width} {total_height}">
-{svg_content}
-</svg>
-"""
+def generate_eye_grid():
+    """4×4 grid of random eyes as one SVG string."""
+    out = io.StringIO()
+    write_eye_grid(out)
+    return out.getvalue()
 
 
 # =====================================================
@@ -440,9 +524,7 @@ def generate_eye_grid():
 
 if __name__ == "__main__":
 
-    svg_output = generate_eye_grid()
-
     with open("genetic_eye_grid.svg", "w") as f:
-        f.write(svg_output)
+        write_eye_grid(f)
 
     print("SVG created: genetic_eye_grid.svg")
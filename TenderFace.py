@@ -1,7 +1,16 @@
-from genes import Genome
+import numpy as np
+
+from compact import COMPACT_STYLE, format_number, join_numbers
+from contact_sheet import write_svg_grid
+from face_cache import face_key
+from genes import GENE_MAP, Genome, gene_dependents, gene_key, gene_usage_report, genes_for, register_genes
+from instrument import instrumented
+from part_cache import part_caching
+from population import GenomePopulation
+from raster import affine, encode_png, render_shapes
 from TenderHead import MinimalHeadGenome
 from TenderEyes import MinimalEyeGenome
-from TenderBrows import TenderBrows
+from TenderBrows import HALF_WIDTH_RANGES, TenderBrows
 from TenderMouth import TenderMouth
 from TenderNose import TenderNose
 
@@ -13,112 +22,146 @@ from TenderNose import TenderNose
 EYE_WIDTH_RATIO = 0.28   # eye width relative to head width (fixed)
 
 
-def _layout_gene(genome, index, lo, hi):
-    """Map gene at index linearly into [lo, hi]."""
-    return lo + (genome.get_gene(index) / 255.0) * (hi - lo)
+# =====================================================
+# GENES
+# =====================================================
+
+NUM_GENES = 200
+
+# Layout genes read directly by generate_face_svg:
+#   64 eye_y · 65 eye spacing · 66 mouth_y · 67 nose_y · 68 nose height
+#   69 brow lift · 70 brow width · 71–72 mouth width
+LAYOUT_GENES = register_genes("layout", range(64, 73))
+
+# Brow inner half-width (TenderBrows keypoint 0), needed to clamp brow_y
+BROW_HW0_GENE = 102
+
+LAYOUT_DEPENDENCIES = {
+    'eye_y':            (64,),
+    'left_eye_x':       (65,),
+    'right_eye_x':      (65,),
+    'brow_y':           (64, 69, BROW_HW0_GENE),
+    'brow_width':       (70,),
+    'left_brow_x':      (65, 70),
+    'right_brow_x':     (65, 70),
+    'nose_y':           (64, 67),
+    'nose_h':           (68,),
+    'max_bridge_x_top': (65, 68),
+    'mouth_x':          (71, 72),
+    'mouth_y':          (64, 66, 67, 68, 71, 72),
+    'mouth_width':      (71, 72),
+}
+# Genes each compute_layout() value is derived from.
+
+FACE_PARTS = ("head", "eyes", "brows", "nose", "mouth", "layout")
+
+# Only these genes are drawn for a face; every other allele stays (0, 0).
+FACE_GENES = genes_for(*FACE_PARTS)
+
+DEFAULT_BATCH_SIZE = 1024
+# Genomes laid out per vectorised pass in generate_faces / contact sheets.
+
+TRANSFORM_PRECISION = 2
+# Decimal places of compact translate() offsets (face units); scale
+# factors get one more, since they multiply coordinates up to 1.
+
+
+def face_gene_report():
+    """Unused / overlapping gene indices of the full face pipeline."""
+    return gene_usage_report(NUM_GENES, FACE_PARTS)
 
 
 # =====================================================
-# FULL FACE GENERATION
+# HEAD DIMENSIONS (same as in TenderHead.py)
 # =====================================================
 
-def generate_face_svg(face_id="0"):
+FACE_HEIGHT = 120
+HEAD_TOP = 20
+HEAD_WIDTH_RATIO = 0.65
 
-    # -------------------------------------------------
-    # 1. SHARED GENOME
-    # -------------------------------------------------
+HEAD_BOTTOM = HEAD_TOP + FACE_HEIGHT
+HEAD_WIDTH = FACE_HEIGHT * HEAD_WIDTH_RATIO
+HALF_WIDTH = HEAD_WIDTH / 2
+CENTER_X = 65
 
-    genome = Genome(num_genes=200)
+# Face structural anchors (mirror TenderHead.py)
+EAR_TOP_Y    = HEAD_TOP + FACE_HEIGHT * 0.30
+EAR_BOTTOM_Y = HEAD_TOP + FACE_HEIGHT * 0.55
+JAW_Y        = HEAD_TOP + FACE_HEIGHT * 0.75
 
-    head      = MinimalHeadGenome(genome)
-    right_eye = MinimalEyeGenome(genome)
-    brows     = TenderBrows(genome)
-    mouth     = TenderMouth(genome)
-    nose      = TenderNose(genome)
+FACE_VIEW_WIDTH = 130
+FACE_VIEW_HEIGHT = 160
 
-    # -------------------------------------------------
-    # 2. HEAD SVG
-    # -------------------------------------------------
+EYE_WIDTH = HEAD_WIDTH * EYE_WIDTH_RATIO
+EYE_SCALE = EYE_WIDTH  # normalised eye has width 1
 
-    head_svg = head.generate_group()
+# Clamp brow_y so the brow never overlaps the eye.
+# Upper eyelid peak can reach up to ~0.30 eye_scale above eye_y (conservative bound).
+# The brow's lowest point (inner end lower edge) sits at brow_y + eye_scale * hw[0].
+UPPER_EYE_EXCURSION = 0.30   # normalised units
+BROW_EYE_GAP        = 0.06   # minimum clearance in normalised units
 
-    # -------------------------------------------------
-    # 3. HEAD DIMENSIONS (same as in TenderHead.py)
-    # -------------------------------------------------
 
-    FACE_HEIGHT = 120
-    HEAD_TOP = 20
-    HEAD_WIDTH_RATIO = 0.65
+@instrumented("genome")
+def _new_genome(seed=None):
+    """Random face genome; reproducible when seed is given."""
+    return Genome(num_genes=NUM_GENES, seed=seed, genes=FACE_GENES)
 
-    HEAD_BOTTOM = HEAD_TOP + FACE_HEIGHT
-    HEAD_WIDTH = FACE_HEIGHT * HEAD_WIDTH_RATIO
-    HALF_WIDTH = HEAD_WIDTH / 2
-    CENTER_X = 65
 
-    # Face structural anchors (mirror TenderHead.py)
-    ear_top_y    = HEAD_TOP + FACE_HEIGHT * 0.30
-    ear_bottom_y = HEAD_TOP + FACE_HEIGHT * 0.55
-    jaw_y        = HEAD_TOP + FACE_HEIGHT * 0.75
+def _layout_gene(genome, index, lo, hi):
+    """Map gene at index linearly into [lo, hi]."""
+    return lo + (genome.get_gene(index) / 255.0) * (hi - lo)
+
+
+# =====================================================
+# FACE LAYOUT
+# =====================================================
+
+@instrumented("layout")
+def compute_layout(genome, brows):
+    """
+    Placement of every part for one genome.
+    Returns a dict of plain floats consumed by _render_face().
+    """
 
     # -------------------------------------------------
-    # 4. EYE PLACEMENT  (genes 55–56)
+    # EYE PLACEMENT  (genes 64–65)
     # -------------------------------------------------
 
-    eye_width = HEAD_WIDTH * EYE_WIDTH_RATIO
-    eye_scale = eye_width  # normalised eye has width 1
-
     # Gene 64: eye vertical position — middle third of ear_top..ear_bottom span
     eye_y = _layout_gene(genome, 64,
-                         ear_top_y + (ear_bottom_y - ear_top_y) * 0.30,
-                         ear_top_y + (ear_bottom_y - ear_top_y) * 0.65)
+                         EAR_TOP_Y + (EAR_BOTTOM_Y - EAR_TOP_Y) * 0.30,
+                         EAR_TOP_Y + (EAR_BOTTOM_Y - EAR_TOP_Y) * 0.65)
 
     # Gene 65: eye center-to-center half-spacing — as fraction of HEAD_WIDTH
     eye_spacing_ratio = _layout_gene(genome, 65, 0.16, 0.22)
     spacing = HEAD_WIDTH * eye_spacing_ratio
 
-    left_eye_x = CENTER_X - spacing - eye_width / 2
-    right_eye_x = CENTER_X + spacing - eye_width / 2
+    left_eye_x = CENTER_X - spacing - EYE_WIDTH / 2
+    right_eye_x = CENTER_X + spacing - EYE_WIDTH / 2
+
+    # -------------------------------------------------
+    # BROW PLACEMENT  (genes 69–70)
+    # -------------------------------------------------
 
     # Gene 69: brow lift — how far above eye_y the brow sits (gene range 0.40–0.75)
-    brow_lift_raw = eye_scale * _layout_gene(genome, 69, 0.40, 0.75)
+    brow_lift_raw = EYE_SCALE * _layout_gene(genome, 69, 0.40, 0.75)
 
     # Gene 70: brow horizontal scale relative to eye width (0.85–1.15)
     brow_x_ratio = _layout_gene(genome, 70, 0.85, 1.15)
-    brow_width   = eye_width * brow_x_ratio   # actual pixel width of brow
-    brow_scale_x = brow_width                 # normalised brow x spans 0→1
+    brow_width   = EYE_WIDTH * brow_x_ratio   # actual pixel width of brow
 
     # Centre the brow on the same centre as its eye
-    left_brow_x  = left_eye_x  + (eye_width - brow_width) / 2
-    right_brow_x = right_eye_x + (eye_width - brow_width) / 2
-
-    # -------------------------------------------------
-    # 5. EYE SVG (normalised)
-    # -------------------------------------------------
-
-    right_eye_svg = right_eye.generate_group(
-        clip_id=f"rightEyeClip_{face_id}",
-        normalize=True
-    )
-
-    left_eye_svg = right_eye.generate_group(
-        clip_id=f"leftEyeClip_{face_id}",
-        normalize=True
-    )
-
-    brow_svg = brows.generate_group()
+    left_brow_x  = left_eye_x  + (EYE_WIDTH - brow_width) / 2
+    right_brow_x = right_eye_x + (EYE_WIDTH - brow_width) / 2
 
-    # Clamp brow_y so the brow never overlaps the eye.
-    # Upper eyelid peak can reach up to ~0.30 eye_scale above eye_y (conservative bound).
-    # The brow's lowest point (inner end lower edge) sits at brow_y + eye_scale * hw[0].
-    UPPER_EYE_EXCURSION = 0.30   # normalised units
-    BROW_EYE_GAP        = 0.06   # minimum clearance in normalised units
     brow_hw0   = brows.get_half_widths()[0]
-    min_lift   = eye_scale * (brow_hw0 + UPPER_EYE_EXCURSION + BROW_EYE_GAP)
+    min_lift   = EYE_SCALE * (brow_hw0 + UPPER_EYE_EXCURSION + BROW_EYE_GAP)
     brow_lift  = max(brow_lift_raw, min_lift)
     brow_y     = eye_y - brow_lift
 
     # -------------------------------------------------
-    # 6. NOSE PLACEMENT  (genes 58–59)
+    # NOSE PLACEMENT  (genes 67–68)
     # -------------------------------------------------
 
     # Nose uses a height-normalised, center-origin coordinate space.
@@ -133,12 +176,10 @@ def generate_face_svg(face_id="0"):
                           eye_y + FACE_HEIGHT * 0.07)
 
     # Constraint: nose bridge top must not be wider than the inner eye gap
-    max_bridge_x_top = max(0.04, (spacing - eye_width / 2) / nose_h)
-
-    nose_svg = nose.generate_group(max_bridge_x_top=max_bridge_x_top)
+    max_bridge_x_top = max(0.04, (spacing - EYE_WIDTH / 2) / nose_h)
 
     # -------------------------------------------------
-    # 7. MOUTH PLACEMENT  (gene 57)
+    # MOUTH PLACEMENT  (genes 66, 71–72)
     # -------------------------------------------------
 
     # Genes 71+72 averaged → bell-curve distribution, extremes are rarer
@@ -149,44 +190,235 @@ def generate_face_svg(face_id="0"):
 
     # Gene 66: mouth vertical — upper jaw area; clamped to never overlap nose
     mouth_y = _layout_gene(genome, 66,
-                           jaw_y - FACE_HEIGHT * 0.08,
-                           jaw_y + FACE_HEIGHT * 0.01)
+                           JAW_Y - FACE_HEIGHT * 0.08,
+                           JAW_Y + FACE_HEIGHT * 0.01)
     # Upper lip extends upward from mouth_y by up to mouth_width * 0.22 (max bow_h)
     mouth_y = max(mouth_y, nose_y + nose_h + mouth_width * 0.32 + 3)
 
-    mouth_svg = mouth.generate_group(normalize=True)
+    return dict(
+        eye_y=eye_y, left_eye_x=left_eye_x, right_eye_x=right_eye_x,
+        brow_y=brow_y, brow_width=brow_width,
+        left_brow_x=left_brow_x, right_brow_x=right_brow_x,
+        nose_y=nose_y, nose_h=nose_h, max_bridge_x_top=max_bridge_x_top,
+        mouth_x=mouth_x, mouth_y=mouth_y, mouth_width=mouth_width,
+    )
 
-    # -------------------------------------------------
-    # 8. COMPOSITE
-    # -------------------------------------------------
 
-    return f"""
-<svg xmlns="http://www.w3.org/2000/svg"
-     viewBox="0 0 130 160">
+@instrumented("layouts")
+def compute_layouts(population):
+    """
+    Vectorised compute_layout() for a whole GenomePopulation.
+    Returns the same keys, each an (N,) float64 array; row n matches
+    compute_layout(population[n], ...) exactly.
+    """
+    genes = population.express(LAYOUT_GENES + (BROW_HW0_GENE,)).astype(np.float64)
+
+    def layout_gene(index, lo, hi):
+        column = genes[:, LAYOUT_GENES.index(index)]
+        return lo + (column / 255.0) * (hi - lo)
+
+    eye_y = layout_gene(64,
+                        EAR_TOP_Y + (EAR_BOTTOM_Y - EAR_TOP_Y) * 0.30,
+                        EAR_TOP_Y + (EAR_BOTTOM_Y - EAR_TOP_Y) * 0.65)
+    spacing = HEAD_WIDTH * layout_gene(65, 0.16, 0.22)
+
+    left_eye_x = CENTER_X - spacing - EYE_WIDTH / 2
+    right_eye_x = CENTER_X + spacing - EYE_WIDTH / 2
+
+    brow_lift_raw = EYE_SCALE * layout_gene(69, 0.40, 0.75)
+    brow_width    = EYE_WIDTH * layout_gene(70, 0.85, 1.15)
+
+    left_brow_x  = left_eye_x  + (EYE_WIDTH - brow_width) / 2
+    right_brow_x = right_eye_x + (EYE_WIDTH - brow_width) / 2
+
+    # Same formula as TenderBrows.compute_half_widths()[0]
+    hw_lo, hw_hi = HALF_WIDTH_RANGES[0]
+    brow_hw0  = hw_lo + (genes[:, -1] / 255.0) * (hw_hi - hw_lo)
+    min_lift  = EYE_SCALE * (brow_hw0 + UPPER_EYE_EXCURSION + BROW_EYE_GAP)
+    brow_y    = eye_y - np.maximum(brow_lift_raw, min_lift)
+
+    nose_h = FACE_HEIGHT * layout_gene(68, 0.18, 0.27)
+    nose_y = layout_gene(67,
+                         eye_y + FACE_HEIGHT * 0.02,
+                         eye_y + FACE_HEIGHT * 0.07)
+    max_bridge_x_top = np.maximum(0.04, (spacing - EYE_WIDTH / 2) / nose_h)
+
+    mouth_width_norm = (genes[:, LAYOUT_GENES.index(71)] + genes[:, LAYOUT_GENES.index(72)]) / 2 / 255.0
+    mouth_width = HEAD_WIDTH * (0.28 + mouth_width_norm * 0.20)
+    mouth_x     = CENTER_X - mouth_width / 2
+
+    mouth_y = layout_gene(66,
+                          JAW_Y - FACE_HEIGHT * 0.08,
+                          JAW_Y + FACE_HEIGHT * 0.01)
+    mouth_y = np.maximum(mouth_y, nose_y + nose_h + mouth_width * 0.32 + 3)
+
+    return dict(
+        eye_y=eye_y, left_eye_x=left_eye_x, right_eye_x=right_eye_x,
+        brow_y=brow_y, brow_width=brow_width,
+        left_brow_x=left_brow_x, right_brow_x=right_brow_x,
+        nose_y=nose_y, nose_h=nose_h, max_bridge_x_top=max_bridge_x_top,
+        mouth_x=mouth_x, mouth_y=mouth_y, mouth_width=mouth_width,
+    )
 
-    <!-- HEAD -->
-    {head_svg}
+
+# =====================================================
+# FULL FACE GENERATION
+# =====================================================
+
+PART_GROUPS = ("head", "eyes", "brows", "nose", "mouth")
+# Part groups generated per face, in compositing order.
+
+
+PART_LAYOUT_ARGS = {"nose": ("max_bridge_x_top",)}
+COMPACT_LAYOUT_ARGS = {"brows": ("brow_width",), "nose": ("max_bridge_x_top", "nose_h"),
+                       "mouth": ("mouth_width",)}
+# Layout values each part's generate_group() is called with (in compact
+# mode the part's view_scale as well).
+
+
+def _part_groups(face_id, genome, layout, brows=None, use_defs=False, compact=False,
+                 parts=PART_GROUPS):
+    """
+    Generates the part groups named in `parts` for one face.
+    Returns {part: svg}; "eyes" maps to a tuple of eye groups — one for
+    use_defs, otherwise (left, right), which differ only in the clip id.
+    """
+    groups = {}
+
+    if "head" in parts:
+        head = MinimalHeadGenome(genome)
+        groups["head"] = head.generate_group(compact=True) if compact else head.generate_group()
+
+    if "eyes" in parts:
+        eye = MinimalEyeGenome(genome)
+        options = dict(normalize=True, compact=True, view_scale=EYE_SCALE) if compact else dict(normalize=True)
+        clip_ids = ([f"eyeClip_{face_id}"] if use_defs
+                    else [f"leftEyeClip_{face_id}", f"rightEyeClip_{face_id}"])
+        groups["eyes"] = tuple(eye.generate_group(clip_id=clip_id, **options) for clip_id in clip_ids)
+
+    if "brows" in parts:
+        brows = brows if brows is not None else TenderBrows(genome)
+        if compact:
+            groups["brows"] = brows.generate_group(
+                compact=True, view_scale=max(layout['brow_width'], EYE_SCALE))
+        else:
+            groups["brows"] = brows.generate_group()
+
+    if "nose" in parts:
+        nose = TenderNose(genome)
+        if compact:
+            groups["nose"] = nose.generate_group(max_bridge_x_top=layout['max_bridge_x_top'],
+                                                 compact=True, view_scale=layout['nose_h'])
+        else:
+            groups["nose"] = nose.generate_group(max_bridge_x_top=layout['max_bridge_x_top'])
+
+    if "mouth" in parts:
+        mouth = TenderMouth(genome)
+        if compact:
+            groups["mouth"] = mouth.generate_group(normalize=True, compact=True,
+                                                   view_scale=layout['mouth_width'])
+        else:
+            groups["mouth"] = mouth.generate_group(normalize=True)
+
+    return groups
+
+
+def _render_face_body(face_id, genome, layout, brows=None, use_defs=False, compact=False):
+    """
+    Generates every part group and composites them at `layout`.
+    Returns the face content without the enclosing <svg> element.
+
+    use_defs: emit the eye and the brow once inside <defs> and place both
+              sides with <use>, instead of two full copies of each.
+    compact:  compact markup (see compact.py); the enclosing document must
+              include COMPACT_STYLE.
+    """
+    groups = _part_groups(face_id, genome, layout, brows, use_defs, compact)
+    return _compose_body(face_id, layout, groups, use_defs, compact)
+
+
+@instrumented("composite")
+def _compose_body(face_id, layout, groups, use_defs=False, compact=False):
+    """Places the part groups from _part_groups() at `layout`."""
+
+    if compact:
+        return _compose_compact_body(face_id, layout, groups, use_defs)
+
+    head_svg  = groups['head']
+    brow_svg  = groups['brows']
+    nose_svg  = groups['nose']
+    mouth_svg = groups['mouth']
+
+    eye_y, eye_scale = layout['eye_y'], EYE_SCALE
+    left_eye_x, right_eye_x = layout['left_eye_x'], layout['right_eye_x']
+    brow_y, brow_width = layout['brow_y'], layout['brow_width']
+    brow_scale_x = brow_width                 # normalised brow x spans 0→1
+    left_brow_x, right_brow_x = layout['left_brow_x'], layout['right_brow_x']
+    nose_y, nose_h = layout['nose_y'], layout['nose_h']
+    mouth_x, mouth_y, mouth_width = layout['mouth_x'], layout['mouth_y'], layout['mouth_width']
+
+    left_eye_transform   = f"translate({left_eye_x + EYE_WIDTH},{eye_y}) scale(-{eye_scale},{eye_scale})"
+    right_eye_transform  = f"translate({right_eye_x},{eye_y}) scale({eye_scale},{eye_scale})"
+    left_brow_transform  = f"translate({left_brow_x + brow_width},{brow_y}) scale(-{brow_scale_x},{eye_scale})"
+    right_brow_transform = f"translate({right_brow_x},{brow_y}) scale({brow_scale_x},{eye_scale})"
+
+    if use_defs:
+        # One eye body (one clip path) and one brow, instanced per side
+        eye_svg, = groups['eyes']
+        eye_ref  = f"eye_{face_id}"
+        brow_ref = f"brow_{face_id}"
+
+        eyes_and_brows = f"""
+    <defs>
+        <g id="{eye_ref}">
+        {eye_svg}
+        </g>
+        <g id="{brow_ref}">
+        {brow_svg}
+        </g>
+    </defs>
 
     <!-- LEFT EYE -->
-    <g transform="translate({left_eye_x + eye_width},{eye_y}) scale(-{eye_scale},{eye_scale})">
+    <use href="#{eye_ref}" transform="{left_eye_transform}"/>
+
+    <!-- RIGHT EYE -->
+    <use href="#{eye_ref}" transform="{right_eye_transform}"/>
+
+    <!-- LEFT BROW -->
+    <use href="#{brow_ref}" transform="{left_brow_transform}"/>
+
+    <!-- RIGHT BROW -->
+    <use href="#{brow_ref}" transform="{right_brow_transform}"/>
+"""
+    else:
+        left_eye_svg, right_eye_svg = groups['eyes']
+
+        eyes_and_brows = f"""
+    <!-- LEFT EYE -->
+    <g transform="{left_eye_transform}">
         {left_eye_svg}
     </g>
 
     <!-- RIGHT EYE -->
-    <g transform="translate({right_eye_x},{eye_y}) scale({eye_scale},{eye_scale})">
+    <g transform="{right_eye_transform}">
         {right_eye_svg}
     </g>
 
     <!-- LEFT BROW -->
-    <g transform="translate({left_brow_x + brow_width},{brow_y}) scale(-{brow_scale_x},{eye_scale})">
+    <g transform="{left_brow_transform}">
         {brow_svg}
     </g>
 
     <!-- RIGHT BROW -->
-    <g transform="translate({right_brow_x},{brow_y}) scale({brow_scale_x},{eye_scale})">
+    <g transform="{right_brow_transform}">
         {brow_svg}
     </g>
+"""
 
+    return f"""
+    <!-- HEAD -->
+    {head_svg}
+{eyes_and_brows}
     <!-- NOSE -->
     <g transform="translate({CENTER_X},{nose_y}) scale({nose_h},{nose_h})">
         {nose_svg}
@@ -197,10 +429,408 @@ def generate_face_svg(face_id="0"):
         {mouth_svg}
     </g>
 
-</svg>
 """
 
 
+def _compact_transform(tx, ty, sx, sy):
+    """translate(...) scale(...) with compact numbers."""
+    translate = join_numbers([format_number(v, TRANSFORM_PRECISION) for v in (tx, ty)])
+    scale = join_numbers([format_number(v, TRANSFORM_PRECISION + 1) for v in (sx, sy)])
+    return f"translate({translate})scale({scale})"
+
+
+def _compose_compact_body(face_id, layout, groups, use_defs):
+    """compact=True counterpart of _compose_body(), without whitespace."""
+    eye_y, eye_scale = layout['eye_y'], EYE_SCALE
+    brow_y, brow_width = layout['brow_y'], layout['brow_width']
+    nose_y, nose_h = layout['nose_y'], layout['nose_h']
+    mouth_width = layout['mouth_width']
+
+    transforms = [
+        _compact_transform(layout['left_eye_x'] + EYE_WIDTH, eye_y, -eye_scale, eye_scale),
+        _compact_transform(layout['right_eye_x'], eye_y, eye_scale, eye_scale),
+        _compact_transform(layout['left_brow_x'] + brow_width, brow_y, -brow_width, eye_scale),
+        _compact_transform(layout['right_brow_x'], brow_y, brow_width, eye_scale),
+    ]
+
+    brow_svg = groups['brows']
+
+    if use_defs:
+        eye_svg, = groups['eyes']
+        refs = [f"eye_{face_id}"] * 2 + [f"brow_{face_id}"] * 2
+        eyes_and_brows = (
+            f'<defs><g id="{refs[0]}">{eye_svg}</g><g id="{refs[2]}">{brow_svg}</g></defs>'
+            + "".join(f'<use href="#{ref}" transform="{transform}"/>'
+                      for ref, transform in zip(refs, transforms))
+        )
+    else:
+        parts = [*groups['eyes'], brow_svg, brow_svg]
+        eyes_and_brows = "".join(f'<g transform="{transform}">{part}</g>'
+                                 for transform, part in zip(transforms, parts))
+
+    return (groups['head']
+            + eyes_and_brows
+            + f'<g transform="{_compact_transform(CENTER_X, nose_y, nose_h, nose_h)}">{groups["nose"]}</g>'
+            + f'<g transform="{_compact_transform(layout["mouth_x"], layout["mouth_y"], mouth_width, mouth_width)}">'
+            + f'{groups["mouth"]}</g>')
+
+
+def _wrap_face(body, compact=False):
+    """Wraps a face body in its standalone <svg> document."""
+    if compact:
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" '
+                f'viewBox="0 0 {FACE_VIEW_WIDTH} {FACE_VIEW_HEIGHT}">'
+                f'{COMPACT_STYLE}{body}</svg>')
+    return f"""
+<svg xmlns="http://www.w3.org/2000/svg"
+     viewBox="0 0 {FACE_VIEW_WIDTH} {FACE_VIEW_HEIGHT}">
+{body}</svg>
+"""
+
+
+@instrumented("face")
+def generate_face_svg(face_id="0", seed=None, genome=None, use_defs=False, compact=False,
+                      cache=None):
+    """
+    Builds one complete face SVG.
+    genome:   optional; by default a fresh random genome is drawn.
+    seed:     optional; the same seed always yields the same face.
+    use_defs: emit eye and brow once and instance them with <use>.
+    compact:  relative path commands, scale-adapted precision, CSS classes
+              and no whitespace (see compact.py).
+    cache:    optional face_cache.FaceCache; a face already rendered for
+              the same expressed genome and options is returned from it.
+    """
+    if genome is None:
+        genome = _new_genome(seed)
+
+    def render():
+        brows = TenderBrows(genome)
+        layout = compute_layout(genome, brows)
+
+        return _wrap_face(_render_face_body(face_id, genome, layout, brows,
+                                            use_defs=use_defs, compact=compact),
+                          compact)
+
+    if cache is None:
+        return render()
+
+    key = face_key(genome, face_id=face_id, use_defs=use_defs, compact=compact)
+    return cache.get_or_render(key, render)
+
+
+def face_shapes(genome, layout=None, brows=None):
+    """
+    The geometry of one face for raster.render_shapes(): a list of
+    (matrix, shape) in face (viewBox) units and paint order, placed
+    exactly as _compose_body() places the SVG groups.
+    """
+    brows = brows if brows is not None else TenderBrows(genome)
+    layout = layout if layout is not None else compute_layout(genome, brows)
+
+    eye_y, eye_scale = layout['eye_y'], EYE_SCALE
+    brow_y, brow_width = layout['brow_y'], layout['brow_width']
+    nose_h, mouth_width = layout['nose_h'], layout['mouth_width']
+
+    eye = MinimalEyeGenome(genome).shapes(normalize=True)
+    brow = brows.shapes()
+
+    placements = [
+        (affine(), MinimalHeadGenome(genome).shapes()),
+        (affine(layout['left_eye_x'] + EYE_WIDTH, eye_y, -eye_scale, eye_scale), eye),
+        (affine(layout['right_eye_x'], eye_y, eye_scale, eye_scale), eye),
+        (affine(layout['left_brow_x'] + brow_width, brow_y, -brow_width, eye_scale), brow),
+        (affine(layout['right_brow_x'], brow_y, brow_width, eye_scale), brow),
+        (affine(CENTER_X, layout['nose_y'], nose_h),
+         TenderNose(genome).shapes(max_bridge_x_top=layout['max_bridge_x_top'])),
+        (affine(layout['mouth_x'], layout['mouth_y'], mouth_width),
+         TenderMouth(genome).shapes(normalize=True)),
+    ]
+    return [(matrix, item) for matrix, items in placements for item in items]
+
+
+@instrumented("raster")
+def render_face_rgba(seed=None, genome=None, width=128, height=160, background=None):
+    """
+    One face as a (height, width, 4) uint8 RGBA array, rendered from the
+    part geometry (no SVG is generated).  seed / genome as for
+    generate_face_svg(); background: None (transparent) or (r, g, b).
+    """
+    if genome is None:
+        genome = _new_genome(seed)
+    return render_shapes(face_shapes(genome), width, height,
+                         (0, 0, FACE_VIEW_WIDTH, FACE_VIEW_HEIGHT), background)
+
+
+def generate_face_png(face_id="0", seed=None, genome=None, width=128, height=160,
+                      background=None):
+    """
+    Renders one face as PNG bytes (see raster.py); arguments as for
+    generate_face_svg(), plus the thumbnail size and an optional
+    (r, g, b) background.  face_id only names SVG clip paths and does not
+    affect the image.
+    """
+    return encode_png(render_face_rgba(seed, genome, width, height, background))
+
+
+def generate_face_points_svg(face_id="0", seed=None, genome=None):
+    """
+    The ctrl-points overlay of a face on its own: every part's anchor and
+    control points, placed exactly over generate_face_svg() output for the
+    same genome.  Faces are rendered without the overlay; this builds it
+    on demand.
+    """
+    if genome is None:
+        genome = _new_genome(seed)
+
+    brows = TenderBrows(genome)
+    layout = compute_layout(genome, brows)
+    groups = {
+        'head':  MinimalHeadGenome(genome).generate_points(),
+        'eyes':  ("", ""),   # eyes have no ctrl-points overlay
+        'brows': brows.generate_points(),
+        'nose':  TenderNose(genome).generate_points(max_bridge_x_top=layout['max_bridge_x_top']),
+        'mouth': TenderMouth(genome).generate_points(normalize=True),
+    }
+    return _wrap_face(_compose_body(face_id, layout, groups))
+
+
+# =====================================================
+# INCREMENTAL RE-RENDER
+# =====================================================
+#
+# An editor that nudges one gene does not need a full render: each gene
+# feeds only a few outputs.  FACE_DEPENDENCIES maps a gene index to
+#
+#   - the part groups that read it (GENE_MAP, following GENE_USES, so the
+#     skin colour genes reach both "head" and "mouth")
+#   - the compute_layout() values derived from it (LAYOUT_DEPENDENCIES)
+#
+# and a changed layout value re-renders the parts called with it
+# (PART_LAYOUT_ARGS / COMPACT_LAYOUT_ARGS).  render_face() keeps the
+# layout and every part group in a FaceRender; update_face() rebuilds only
+# the dependent pieces and composites again.
+
+
+def face_dependency_graph():
+    """{gene index: frozenset of part names and layout keys it feeds}."""
+    graph = gene_dependents(*PART_GROUPS)
+    for key, indices in LAYOUT_DEPENDENCIES.items():
+        for index in indices:
+            graph.setdefault(index, set()).add(key)
+    return {index: frozenset(outputs) for index, outputs in sorted(graph.items())}
+
+
+FACE_DEPENDENCIES = face_dependency_graph()
+
+
+class FaceRender:
+    """
+    One rendered face plus what produced it: the gene snapshot, layout
+    and part groups.  Treated as immutable; update_face() returns a new one.
+    """
+
+    def __init__(self, face_id, use_defs, compact, genes, layout, groups, svg):
+        self.face_id = face_id
+        self.use_defs = use_defs
+        self.compact = compact
+        self.genes = genes
+        self.layout = layout
+        self.groups = groups
+        self.svg = svg
+
+
+def _gene_snapshot(genome):
+    """Expressed genes plus the skin allele sums (read averaged)."""
+    return genome.expressed(), gene_key(genome, "skin")
+
+
+@instrumented("face.render")
+def render_face(face_id="0", seed=None, genome=None, use_defs=False, compact=False):
+    """
+    generate_face_svg() that keeps its intermediate results; the SVG is
+    FaceRender.svg.  Arguments as for generate_face_svg().  Part groups
+    go through the part cache, since edited faces keep most of their genes.
+    """
+    if genome is None:
+        genome = _new_genome(seed)
+
+    brows = TenderBrows(genome)
+    layout = compute_layout(genome, brows)
+    with part_caching():
+        groups = _part_groups(face_id, genome, layout, brows, use_defs, compact)
+    svg = _wrap_face(_compose_body(face_id, layout, groups, use_defs, compact), compact)
+    return FaceRender(face_id, use_defs, compact, _gene_snapshot(genome), layout, groups, svg)
+
+
+@instrumented("face.update")
+def update_face(render, genome, changed=None):
+    """
+    Re-renders `render` for `genome`, recomputing only what depends on
+    the changed genes.  Returns a new FaceRender; `render` is unchanged.
+
+    changed: gene indices that differ from the genome `render` was made
+             from; by default they are found by comparing gene snapshots.
+    """
+    genes = _gene_snapshot(genome)
+
+    if changed is None:
+        (old_expressed, old_skin), (expressed, skin) = render.genes, genes
+        changed = {i for i, (old, new) in enumerate(zip(old_expressed, expressed)) if old != new}
+        if skin != old_skin:
+            changed.update(GENE_MAP["skin"])
+
+    outputs = set()
+    for index in changed:
+        outputs |= FACE_DEPENDENCIES.get(index, frozenset())
+    if not outputs:
+        return FaceRender(render.face_id, render.use_defs, render.compact, genes,
+                          render.layout, render.groups, render.svg)
+
+    parts = outputs.intersection(PART_GROUPS)
+    layout = render.layout
+    if not outputs.isdisjoint(LAYOUT_DEPENDENCIES):
+        layout = compute_layout(genome, TenderBrows(genome))
+        layout_args = COMPACT_LAYOUT_ARGS if render.compact else PART_LAYOUT_ARGS
+        parts.update(part for part, keys in layout_args.items()
+                     if any(layout[key] != render.layout[key] for key in keys))
+
+    groups = dict(render.groups)
+    with part_caching():
+        groups.update(_part_groups(render.face_id, genome, layout, use_defs=render.use_defs,
+                                   compact=render.compact, parts=parts))
+    body = _compose_body(render.face_id, layout, groups, render.use_defs, render.compact)
+    return FaceRender(render.face_id, render.use_defs, render.compact, genes,
+                      layout, groups, _wrap_face(body, render.compact))
+
+
+def _face_count(n, genomes):
+    """
+    The number of faces a batch call draws: n, at most len(genomes), or
+    len(genomes) when n is None.  Raises ValueError up front, so lazy
+    callers do not defer bad arguments to their first face.
+    """
+    if genomes is not None:
+        n = len(genomes) if n is None else min(n, len(genomes))
+    elif n is None:
+        raise ValueError("Either n or genomes is required")
+    if n < 0:
+        raise ValueError(f"n must be at least 0, got {n}")
+    return n
+
+
+def _face_bodies(n, seed=None, genomes=None, use_defs=False, compact=False,
+                 cache_parts=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yields face bodies (see _render_face_body) for a batch of genomes;
+    n as returned by _face_count().
+
+    The population is processed `batch_size` genomes at a time: layouts are
+    computed per batch with array math, and random genomes are drawn per
+    batch from one generator, so memory does not grow with n.
+    """
+    if genomes is None:
+        rng = np.random.default_rng(seed)
+        batches = (
+            GenomePopulation.random(min(batch_size, n - start), NUM_GENES, seed=rng, genes=FACE_GENES)
+            for start in range(0, n, batch_size)
+        )
+    else:
+        if not isinstance(genomes, GenomePopulation):
+            genomes = GenomePopulation.from_genomes(genomes)
+        genomes = genomes[:n]
+        batches = (genomes[start:start + batch_size]
+                   for start in range(0, genomes.size, batch_size))
+
+    face_index = 0
+    for batch in batches:
+        layouts = {key: values.tolist() for key, values in compute_layouts(batch).items()}
+
+        for i in range(batch.size):
+            layout = {key: values[i] for key, values in layouts.items()}
+            # Caching is switched per face, never across a yield
+            with part_caching(cache_parts):
+                body = _render_face_body(str(face_index), batch.genome(i), layout,
+                                         use_defs=use_defs, compact=compact)
+            yield body
+            face_index += 1
+
+
+def generate_faces(n=None, seed=None, genomes=None, use_defs=False, compact=False,
+                   cache_parts=False):
+    """
+    Returns an iterator of face SVGs, built lazily, for a whole batch.
+
+    n       : number of faces; defaults to len(genomes)
+    seed    : seeds the batch genome draw (numpy RNG, so a batch seed does
+              not reproduce generate_face_svg(seed=...) faces)
+    genomes : optional GenomePopulation or sequence of Genome objects
+    use_defs,
+    compact : as in generate_face_svg()
+    cache_parts : reuse part groups through the part cache (part_cache.py);
+              worth it only when faces share genes, e.g. bred siblings
+
+    Face layout is computed with array math for DEFAULT_BATCH_SIZE genomes
+    at a time; each SVG is only built when the iterator reaches it.
+    Arguments are checked when called, not on the first face.
+    """
+    n = _face_count(n, genomes)
+    bodies = _face_bodies(n, seed, genomes, use_defs, compact, cache_parts)
+    return (_wrap_face(body, compact) for body in bodies)
+
+
+def write_contact_sheet(out, n=None, cols=10, seed=None, genomes=None, use_defs=False,
+                        compact=False):
+    """
+    Streams a grid of faces as one SVG document to the file-like `out`.
+    Arguments as in generate_faces(); memory use is independent of n.
+    Returns the number of faces written.
+    """
+    n = _face_count(n, genomes)
+    return write_svg_grid(out, _face_bodies(n, seed, genomes, use_defs, compact), n, cols,
+                          FACE_VIEW_WIDTH, FACE_VIEW_HEIGHT,
+                          preamble=COMPACT_STYLE if compact else "")
+
+
+# =====================================================
+# OUTPUT SIZE
+# =====================================================
+
+def svg_size_report(n=100, seed=0):
+    """
+    Byte sizes of the same n faces in every output mode.
+
+    Returns a list of dicts, one per (use_defs, compact) combination:
+        use_defs, compact : the mode
+        bytes             : total UTF-8 size of the n face documents
+        per_face          : average bytes per face
+        reduction         : fraction saved relative to the default mode
+    """
+    population = GenomePopulation.random(n, NUM_GENES, seed=seed, genes=FACE_GENES)
+
+    rows = []
+    for use_defs in (False, True):
+        for compact in (False, True):
+            total = sum(len(svg.encode())
+                        for svg in generate_faces(genomes=population,
+                                                  use_defs=use_defs, compact=compact))
+            rows.append(dict(use_defs=use_defs, compact=compact, bytes=total,
+                             per_face=total / n))
+
+    for row in rows:
+        row['reduction'] = 1 - row['bytes'] / rows[0]['bytes']
+    return rows
+
+
+def format_size_report(rows):
+    """svg_size_report() rows as a plain-text table."""
+    lines = ["use_defs  compact   bytes/face  reduction"]
+    for row in rows:
+        lines.append(f"{str(row['use_defs']):<9} {str(row['compact']):<9} "
+                     f"{row['per_face']:>10.0f}  {row['reduction']:>8.1%}")
+    return "\n".join(lines)
+
+
 # =====================================================
 # ENTRY POINT
 # =====================================================
@@ -1,4 +1,12 @@
-from genes import Genome
+import io
+
+from contact_sheet import write_svg_grid
+from genes import Genome, register_genes
+from compact import hex_color, precision_for_scale
+from instrument import instrumented
+from part_cache import cached_group
+from paths import Path
+from raster import shape
 
 # =====================================================
 # GLOBAL DIMENSIONS (NOT GENETIC YET)
@@ -9,6 +17,9 @@ HEAD_TOP = 20
 
 HEAD_WIDTH_RATIO = 0.65
 
+# The head shape is fixed; only the fill color is genetic.
+HEAD_GENES = register_genes("head", [], uses=("skin",))
+
 
 # =====================================================
 # MINIMAL HEAD GENOME
@@ -37,9 +48,8 @@ class MinimalHeadGenome:
     # GROUP GENERATION
     # =====================================================
 
-    def generate_group(self):
-
-        skin_color = self.get_skin_color()
+    def _anchor_points(self):
+        """Named anchor and Bezier control points of the head outline."""
 
         CENTER_X = 65
         HEAD_BOTTOM = HEAD_TOP + FACE_HEIGHT
@@ -71,42 +81,6 @@ class MinimalHeadGenome:
         chin_side_left_x  = CENTER_X - chin_side_offset
         chin_side_right_x = CENTER_X + chin_side_offset
 
-
-
-        # =====================================================
-        # ABSOLUTE PATH (FULLY SYMMETRIC)
-        # =====================================================
-
-        d = f"""
-        M {top_x} {top_y}
-
-        C {top_x + HALF_WIDTH*0.5} {top_y}
-        {ear_right_x} {ear_top_y - 40}
-        {ear_right_x} {ear_top_y}
-
-        L {ear_right_x} {ear_bottom_y}
-
-        L {jaw_right_x} {jaw_y}
-
-        L {chin_side_right_x} {chin_side_y}
-
-        L {chin_x} {chin_y}
-
-        L {chin_side_left_x} {chin_side_y}
-
-        L {jaw_left_x} {jaw_y}
-
-        L {ear_left_x} {ear_bottom_y}
-
-        L {ear_left_x} {ear_top_y}
-
-        C {ear_left_x} {ear_top_y - 40}
-        {top_x - HALF_WIDTH*0.5} {top_y}
-        {top_x} {top_y}
-        """
-
-
-
         # Bezier control points for the top curves
         ctrl_top_right_x = top_x + HALF_WIDTH * 0.5
         ctrl_top_right_y = top_y
@@ -118,81 +92,132 @@ class MinimalHeadGenome:
         ctrl_top_left_x  = top_x - HALF_WIDTH * 0.5
         ctrl_top_left_y  = top_y
 
-        def pt(cx, cy, color="red"):
-            return f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="2" fill="{color}"/>'
+        return dict(
+            top_x=top_x, top_y=top_y, chin_x=chin_x, chin_y=chin_y,
+            ear_top_y=ear_top_y, ear_bottom_y=ear_bottom_y,
+            ear_left_x=ear_left_x, ear_right_x=ear_right_x,
+            jaw_y=jaw_y, jaw_left_x=jaw_left_x, jaw_right_x=jaw_right_x,
+            chin_side_y=chin_side_y,
+            chin_side_left_x=chin_side_left_x, chin_side_right_x=chin_side_right_x,
+            ctrl_top_right_x=ctrl_top_right_x, ctrl_top_right_y=ctrl_top_right_y,
+            ctrl_ear_right_x=ctrl_ear_right_x, ctrl_ear_right_y=ctrl_ear_right_y,
+            ctrl_ear_left_x=ctrl_ear_left_x, ctrl_ear_left_y=ctrl_ear_left_y,
+            ctrl_top_left_x=ctrl_top_left_x, ctrl_top_left_y=ctrl_top_left_y,
+        )
+
+    def _outline_path(self):
+        """The head outline as a Path (absolute, fully symmetric)."""
+        p = self._anchor_points()
+
+        return (Path(precision=2)
+                .move_to(p['top_x'], p['top_y'])
+                .curve_to(p['ctrl_top_right_x'], p['ctrl_top_right_y'],
+                          p['ctrl_ear_right_x'], p['ctrl_ear_right_y'],
+                          p['ear_right_x'], p['ear_top_y'])
+                .line_to(p['ear_right_x'], p['ear_bottom_y'])
+                .line_to(p['jaw_right_x'], p['jaw_y'])
+                .line_to(p['chin_side_right_x'], p['chin_side_y'])
+                .line_to(p['chin_x'], p['chin_y'])
+                .line_to(p['chin_side_left_x'], p['chin_side_y'])
+                .line_to(p['jaw_left_x'], p['jaw_y'])
+                .line_to(p['ear_left_x'], p['ear_bottom_y'])
+                .line_to(p['ear_left_x'], p['ear_top_y'])
+                .curve_to(p['ctrl_ear_left_x'], p['ctrl_ear_left_y'],
+                          p['ctrl_top_left_x'], p['ctrl_top_left_y'],
+                          p['top_x'], p['top_y']))
+
+    @instrumented("head.generate_group")
+    @cached_group("head")
+    def generate_group(self, compact=False, show_points=False):
+        """
+        compact:     compact markup (see compact.py)
+        show_points: append the hidden ctrl-points group (generate_points());
+                     ignored when compact
+        """
 
-        def ctrl_line(x1, y1, x2, y2):
-            return f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="red" stroke-width="0.4" stroke-dasharray="1.5 1"/>'
+        skin_color = self.get_skin_color()
+        d = self._outline_path()
 
-        points_svg = f"""
-<g class="ctrl-points" style="display:none">
-  {ctrl_line(top_x, top_y, ctrl_top_right_x, ctrl_top_right_y)}
-  {ctrl_line(ear_right_x, ear_top_y, ctrl_ear_right_x, ctrl_ear_right_y)}
-  {ctrl_line(top_x, top_y, ctrl_top_left_x, ctrl_top_left_y)}
-  {ctrl_line(ear_left_x, ear_top_y, ctrl_ear_left_x, ctrl_ear_left_y)}
-  {pt(top_x, top_y)}
-  {pt(ear_right_x, ear_top_y)}
-  {pt(ear_right_x, ear_bottom_y)}
-  {pt(jaw_right_x, jaw_y)}
-  {pt(chin_side_right_x, chin_side_y)}
-  {pt(chin_x, chin_y)}
-  {pt(chin_side_left_x, chin_side_y)}
-  {pt(jaw_left_x, jaw_y)}
-  {pt(ear_left_x, ear_bottom_y)}
-  {pt(ear_left_x, ear_top_y)}
-  {pt(ctrl_top_right_x, ctrl_top_right_y, "blue")}
-  {pt(ctrl_ear_right_x, ctrl_ear_right_y, "blue")}
-  {pt(ctrl_top_left_x, ctrl_top_left_y, "blue")}
-  {pt(ctrl_ear_left_x, ctrl_ear_left_y, "blue")}
-</g>"""
+        if compact:
+            d = d.to_svg(precision_for_scale(1.0), compact=True)
+            return f'<path class="o" d="{d}" fill="{hex_color(skin_color)}"/>'
+
+        points_svg = "\n" + self.generate_points(hidden=True) if show_points else ""
 
         return f"""
-<path d="{d}"
+<path d="{d.to_svg()}"
       fill="rgb{skin_color}"
       stroke="black"
       stroke-width="0.5"/>
 {points_svg}
 """
 
-def generate_head_grid():
+    def shapes(self):
+        """The head as raster.shape() geometry, in face coordinates."""
+        return [shape([self._outline_path()], fill=self.get_skin_color(),
+                      stroke=(0, 0, 0), stroke_width=0.5)]
 
-    COLS = 4
-    ROWS = 4
+    def generate_points(self, hidden=False):
+        """
+        The ctrl-points overlay alone: anchors (red), Bezier control points
+        (blue) and their handles.  hidden=True adds style="display:none".
+        """
+        p = self._anchor_points()
 
-    CELL_WIDTH = 130
-    CELL_HEIGHT = 160
+        def pt(cx, cy, color="red"):
+            return f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="2" fill="{color}"/>'
 
-    total_width = COLS * CELL_WIDTH
-    total_height = ROWS * CELL_HEIGHT
+        def ctrl_line(x1, y1, x2, y2):
+            return f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="red" stroke-width="0.4" stroke-dasharray="1.5 1"/>'
 
-    svg_content = ""
+        style = ' style="display:none"' if hidden else ''
+
+        return f"""<g class="ctrl-points"{style}>
+  {ctrl_line(p['top_x'], p['top_y'], p['ctrl_top_right_x'], p['ctrl_top_right_y'])}
+  {ctrl_line(p['ear_right_x'], p['ear_top_y'], p['ctrl_ear_right_x'], p['ctrl_ear_right_y'])}
+  {ctrl_line(p['top_x'], p['top_y'], p['ctrl_top_left_x'], p['ctrl_top_left_y'])}
+  {ctrl_line(p['ear_left_x'], p['ear_top_y'], p['ctrl_ear_left_x'], p['ctrl_ear_left_y'])}
+  {pt(p['top_x'], p['top_y'])}
+  {pt(p['ear_right_x'], p['ear_top_y'])}
+  {pt(p['ear_right_x'], p['ear_bottom_y'])}
+  {pt(p['jaw_right_x'], p['jaw_y'])}
+  {pt(p['chin_side_right_x'], p['chin_side_y'])}
+  {pt(p['chin_x'], p['chin_y'])}
+  {pt(p['chin_side_left_x'], p['chin_side_y'])}
+  {pt(p['jaw_left_x'], p['jaw_y'])}
+  {pt(p['ear_left_x'], p['ear_bottom_y'])}
+  {pt(p['ear_left_x'], p['ear_top_y'])}
+  {pt(p['ctrl_top_right_x'], p['ctrl_top_right_y'], "blue")}
+  {pt(p['ctrl_ear_right_x'], p['ctrl_ear_right_y'], "blue")}
+  {pt(p['ctrl_top_left_x'], p['ctrl_top_left_y'], "blue")}
+  {pt(p['ctrl_ear_left_x'], p['ctrl_ear_left_y'], "blue")}
+</g>"""
 
-    for row in range(ROWS):
-        for col in range(COLS):
 
-            head = MinimalHeadGenome()
+def write_head_grid(out, rows=4, cols=4):
+    """Streams a rows × cols grid of random heads to the file-like `out`."""
 
-            tx = col * CELL_WIDTH
-            ty = row * CELL_HEIGHT
+    CELL_WIDTH = 130
+    CELL_HEIGHT = 160
 
-            svg_content += f"""
-<g transform="translate({tx},{ty})">
-{head.generate_group(show_points=False)}
-</g>
-"""
+    cells = (
+        MinimalHeadGenome().generate_group()
+        for _ in range(rows * cols)
+    )
 
-    return f"""
-<svg xmlns="http://www.w3.org/2000/svg"
-     viewBox="0 0 {total_width} {total_height}">
-{svg_content}
-</svg>
-"""
+    write_svg_grid(out, cells, rows * cols, cols, CELL_WIDTH, CELL_HEIGHT)
+
+
+def generate_head_grid():
+    """4×4 grid of random heads as one SVG string."""
+    out = io.StringIO()
+    write_head_grid(out)
+    return out.getvalue()
 
-if __name__ == "__main__":
 
-    svg_output = generate_head_grid()
+if __name__ == "__main__":
 
     with open("genetic_head_grid.svg", "w") as f:
-        f.write(svg_output)
+        write_head_grid(f)
 
     print("SVG created: genetic_head_grid.svg")
@@ -1,4 +1,9 @@
-from genes import Genome
+from genes import Genome, register_genes
+from compact import format_number, hex_color, precision_for_scale
+from instrument import instrumented
+from part_cache import cached_group
+from paths import Path
+from raster import shape
 
 
 # =====================================================
@@ -27,6 +32,9 @@ MOUTH_WIDTH = 100
 # 95: lower_fullness lower lip center depth relative to sides (0.8x … 1.2x lower_h)
 GENE_BASE = 80
 
+# Lip color is derived from the skin color, so the mouth also reads "skin".
+MOUTH_GENES = register_genes("mouth", range(GENE_BASE, GENE_BASE + 16), uses=("skin",))
+
 LIP_OVERLAP = 0.020   # fraction of w; both lips extend this far past the midline corners
 
 
@@ -135,44 +143,24 @@ class TenderMouth:
         span = x1 - x0
         return (x0 + span*t, vy, x1 - span*t, vy)
 
-    def _seg_fwd(self, x0, y0, x1, y1, t=0.35, arch=0):
-        """Cubic bezier from (x0,y0) → (x1,y1) with symmetric tension t.
+    def _seg_fwd(self, path, x0, y0, x1, y1, t=0.35, arch=0):
+        """Appends a cubic bezier (x0,y0) → (x1,y1) with symmetric tension t.
         arch offsets both control points' y (negative = bow upward)."""
-        dx, dy = x1 - x0, y1 - y0
-        return (f"C {x0+dx*t:.4f} {y0+dy*t+arch:.4f} "
-                f"{x1-dx*t:.4f} {y1-dy*t+arch:.4f} "
-                f"{x1:.4f} {y1:.4f} ")
+        path.curve_to(*self._seg_ctrl(x0, y0, x1, y1, t, arch), x1, y1)
 
-    def _seg_rev(self, x0, y0, x1, y1, t=0.35, arch=0):
-        """Same segment traversed backwards: (x1,y1) → (x0,y0)."""
-        dx, dy = x1 - x0, y1 - y0
-        return (f"C {x1-dx*t:.4f} {y1-dy*t+arch:.4f} "
-                f"{x0+dx*t:.4f} {y0+dy*t+arch:.4f} "
-                f"{x0:.4f} {y0:.4f} ")
-
-    def _mid_fwd(self, x0, y0, x1, y1, vy, t=0.35):
+    def _mid_fwd(self, path, x0, y0, x1, y1, vy, t=0.35):
         """
-        Mid segment forward: both endpoints share y0=y1 (the peak_y),
+        Appends the mid segment: both endpoints share y0=y1 (the peak_y),
         but the bezier dips to vy at the center.
         """
-        span = x1 - x0
-        return (f"C {x0+span*t:.4f} {vy:.4f} "
-                f"{x1-span*t:.4f} {vy:.4f} "
-                f"{x1:.4f} {y1:.4f} ")
-
-    def _mid_rev(self, x0, y0, x1, y1, vy, t=0.35):
-        """Mid segment reversed: (x1,y1) → (x0,y0), same internal dip."""
-        span = x1 - x0
-        return (f"C {x1-span*t:.4f} {vy:.4f} "
-                f"{x0+span*t:.4f} {vy:.4f} "
-                f"{x0:.4f} {y0:.4f} ")
+        path.curve_to(*self._mid_ctrl(x0, x1, vy, t), x1, y1)
 
     # =====================================================
     # MIDLINE PATHS
     # =====================================================
 
     def _midline_fwd(self, w, y_offset=0):
-        """5-segment midline path from left corner to right corner.
+        """5-segment midline Path from left corner to right corner.
         y_offset shifts all y coordinates (positive = down)."""
         g = self._midline_geometry(w)
         x1, x2, x4, x5 = g['x1'], g['x2'], g['x4'], g['x5']
@@ -180,40 +168,24 @@ class TenderMouth:
         ia = g['inner_arch']
         cy, py, vy = g['corner_y'] + cl, g['peak_y'] + cl, g['valley_y'] + cl
 
-        d = f"M 0.0000 {cl:.4f} "
-        d += self._seg_fwd(0,  cl, x1, cy)                # outer_left
-        d += self._seg_fwd(x1, cy, x2, py, arch=ia)       # inner_left
-        d += self._mid_fwd(x2, py, x4, py, vy)            # mid (dips to valley)
-        d += self._seg_fwd(x4, py, x5, cy, arch=ia)       # inner_right
-        d += self._seg_fwd(x5, cy, w,  cl)                # outer_right
+        d = Path().move_to(0.0, cl)
+        self._seg_fwd(d, 0,  cl, x1, cy)                  # outer_left
+        self._seg_fwd(d, x1, cy, x2, py, arch=ia)         # inner_left
+        self._mid_fwd(d, x2, py, x4, py, vy)              # mid (dips to valley)
+        self._seg_fwd(d, x4, py, x5, cy, arch=ia)         # inner_right
+        self._seg_fwd(d, x5, cy, w,  cl)                  # outer_right
         return d
 
     def _midline_rev(self, w, y_offset=0):
         """Same midline traversed right → left.
         y_offset shifts all y coordinates (positive = down)."""
-        g = self._midline_geometry(w)
-        x1, x2, x4, x5 = g['x1'], g['x2'], g['x4'], g['x5']
-        cl = g['corner_lift'] + y_offset
-        ia = g['inner_arch']
-        cy, py, vy = g['corner_y'] + cl, g['peak_y'] + cl, g['valley_y'] + cl
-
-        d = f"M {w:.4f} {cl:.4f} "
-        d += self._seg_rev(x5, cy, w,  cl)                # outer_right reversed
-        d += self._seg_rev(x4, py, x5, cy, arch=ia)       # inner_right reversed
-        d += self._mid_rev(x2, py, x4, py, vy)            # mid reversed
-        d += self._seg_rev(x1, cy, x2, py, arch=ia)       # inner_left reversed
-        d += self._seg_rev(0,  cl, x1, cy)                # outer_left reversed
-        return d
-
-    def _strip_move(self, path_d):
-        """Strip the leading 'M x y' token from a path d-string."""
-        tokens = path_d.split()
-        return " ".join(tokens[3:])   # skip 'M', x, y
+        return self._midline_fwd(w, y_offset).reversed()
 
     # =====================================================
     # LIP PATH CONSTRUCTION
     # =====================================================
 
+    @instrumented("mouth.build_upper_lip")
     def build_upper_lip(self, w, bow_h, valley_h, bow_x, ctrl, corner_lift, bow_sharpness):
         """
         Upper lip: Cupid's bow on top, straight base below the midline.
@@ -232,30 +204,31 @@ class TenderMouth:
         # c2 of the rising segment and c1 of the leaving segment meet at the peak.
         # When smooth=0 both collapse to the peak point, creating a cusp.
 
+        d = Path().move_to(0.0, cl)
         # Corner → left peak
-        seg1 = (f"C {ctrl:.4f} {cl - bow_h*0.5:.4f} "
-                f"{lp_x - ctrl*smooth:.4f} {cl - bow_h:.4f} "
-                f"{lp_x:.4f} {cl - bow_h:.4f} ")
+        d.curve_to(ctrl, cl - bow_h*0.5,
+                   lp_x - ctrl*smooth, cl - bow_h,
+                   lp_x, cl - bow_h)
         # Left peak → center valley
-        seg2 = (f"C {lp_x + ctrl*smooth:.4f} {cl - bow_h:.4f} "
-                f"{cx - ctrl:.4f} {cl - valley_h:.4f} "
-                f"{cx:.4f} {cl - valley_h:.4f} ")
+        d.curve_to(lp_x + ctrl*smooth, cl - bow_h,
+                   cx - ctrl, cl - valley_h,
+                   cx, cl - valley_h)
         # Center valley → right peak (mirror of seg2)
-        seg3 = (f"C {cx + ctrl:.4f} {cl - valley_h:.4f} "
-                f"{rp_x - ctrl*smooth:.4f} {cl - bow_h:.4f} "
-                f"{rp_x:.4f} {cl - bow_h:.4f} ")
+        d.curve_to(cx + ctrl, cl - valley_h,
+                   rp_x - ctrl*smooth, cl - bow_h,
+                   rp_x, cl - bow_h)
         # Right peak → corner (mirror of seg1)
-        seg4 = (f"C {rp_x + ctrl*smooth:.4f} {cl - bow_h:.4f} "
-                f"{w - ctrl:.4f} {cl - bow_h*0.5:.4f} "
-                f"{w:.4f} {cl:.4f} ")
+        d.curve_to(rp_x + ctrl*smooth, cl - bow_h,
+                   w - ctrl, cl - bow_h*0.5,
+                   w, cl)
 
         # Base: midline shape shifted down by LIP_OVERLAP so midline sits inside the lip
-        overlap     = w * LIP_OVERLAP
-        midline_base = self._strip_move(self._midline_rev(w, y_offset=overlap))
+        overlap = w * LIP_OVERLAP
         # Bow ends at (w, cl); bridge down to shifted midline start (w, cl+overlap), then trace back
-        return (f"M 0.0000 {cl:.4f} {seg1}{seg2}{seg3}{seg4}"
-                f"L {w:.4f} {cl + overlap:.4f} {midline_base} Z")
+        d.line_to(w, cl + overlap)
+        return (d + self._midline_rev(w, y_offset=overlap).strip_move()).close()
 
+    @instrumented("mouth.build_lower_lip")
     def build_lower_lip(self, w, lower_h, l_ctrl, corner_lift, lower_fullness):
         """
         Lower lip: straight top edge slightly above midline corners, two-segment arc below.
@@ -271,28 +244,29 @@ class TenderMouth:
         arc_ctrl_y  = cl + lower_h          # side control-point y for each half-arc
 
         # Top edge: midline shape shifted up by LIP_OVERLAP
-        midline_top = self._strip_move(self._midline_fwd(w, y_offset=-overlap))
+        d = Path().move_to(0.0, top_y) + self._midline_fwd(w, y_offset=-overlap).strip_move()
 
         # Two symmetric cubic beziers meeting at the center-bottom point
-        right_arc = (f"C {w - l_ctrl:.4f} {arc_ctrl_y:.4f} "
-                     f"{cx + l_ctrl*0.5:.4f} {center_y:.4f} "
-                     f"{cx:.4f} {center_y:.4f} ")
-        left_arc  = (f"C {cx - l_ctrl*0.5:.4f} {center_y:.4f} "
-                     f"{l_ctrl:.4f} {arc_ctrl_y:.4f} "
-                     f"0.0000 {top_y:.4f} ")
+        d.curve_to(w - l_ctrl, arc_ctrl_y,          # right arc
+                   cx + l_ctrl*0.5, center_y,
+                   cx, center_y)
+        d.curve_to(cx - l_ctrl*0.5, center_y,       # left arc
+                   l_ctrl, arc_ctrl_y,
+                   0.0, top_y)
 
-        return f"M 0.0000 {top_y:.4f} {midline_top} {right_arc}{left_arc} Z"
+        return d.close()
 
     # =====================================================
     # CONTROL-POINT VISUALIZATION
     # =====================================================
 
     def _ctrl_points_group(self, w, bow_h, valley_h, bow_x, ctrl, lower_h, l_ctrl,
-                           bow_sharpness, lower_fullness):
+                           bow_sharpness, lower_fullness, hidden=True):
         """
-        Hidden SVG group (class="ctrl-points") showing all bezier handles.
+        SVG group (class="ctrl-points") showing all bezier handles.
         Red  = anchor points on the path.
         Blue = cubic bezier control points.
+        hidden=True adds style="display:none".
         """
         g   = self._midline_geometry(w)
         mx1, mx2, mx4, mx5 = g['x1'], g['x2'], g['x4'], g['x5']
@@ -314,7 +288,8 @@ class TenderMouth:
             return (f'<line x1="{x1:.4f}" y1="{y1:.4f}" x2="{x2:.4f}" y2="{y2:.4f}"'
                     f' stroke="red" stroke-width="{sw}" stroke-dasharray="0.04 0.02"/>')
 
-        out = '<g class="ctrl-points" style="display:none">\n'
+        style = ' style="display:none"' if hidden else ''
+        out = f'<g class="ctrl-points"{style}>\n'
 
         # ---- Midline: 5 segments ----
         midline_anchors = [(0, cl), (mx1, mcy), (mx2, mpy), (mx4, mpy), (mx5, mcy), (w, cl)]
@@ -355,33 +330,62 @@ class TenderMouth:
     # GROUP GENERATION
     # =====================================================
 
-    def generate_group(self, normalize=False):
-
-        w = 1.0 if normalize else MOUTH_WIDTH
-
-        # Upper lip parameters
-        bow_h    = w * (0.06 + self._gene(0) * 0.24)   # 0.06w–0.30w
-        valley_h = bow_h * (0.15 + self._gene(1) * 0.85)  # 0.15–1.00 of bow_h
-        bow_x    = 0.22 + self._gene(3) * 0.16
-        ctrl     = w * (0.06 + self._gene(4) * 0.08)
+    def _lip_params(self, w):
+        """Gene-derived lip shape parameters for a mouth of width w."""
+        bow_h = w * (0.06 + self._gene(0) * 0.24)   # 0.06w–0.30w
+        return dict(
+            # Upper lip parameters
+            bow_h    = bow_h,
+            valley_h = bow_h * (0.15 + self._gene(1) * 0.85),  # 0.15–1.00 of bow_h
+            bow_x    = 0.22 + self._gene(3) * 0.16,
+            ctrl     = w * (0.06 + self._gene(4) * 0.08),
+
+            # Lower lip parameters
+            lower_h  = w * (0.09 + self._gene(2) * 0.13),
+            l_ctrl   = w * (0.20 + self._gene(5) * 0.20),
+
+            bow_sharpness  = self._gene(14),
+            lower_fullness = self._gene(15),
+        )
+
+    def _paths(self, w):
+        """(upper lip, lower lip, midline) Paths for a mouth of width w."""
+        p = self._lip_params(w)
+        corner_lift = self._midline_geometry(w)['corner_lift']
 
-        # Lower lip parameters
-        lower_h  = w * (0.09 + self._gene(2) * 0.13)
-        l_ctrl   = w * (0.20 + self._gene(5) * 0.20)
+        upper = self.build_upper_lip(w, p['bow_h'], p['valley_h'], p['bow_x'], p['ctrl'],
+                                     corner_lift, p['bow_sharpness'])
+        lower = self.build_lower_lip(w, p['lower_h'], p['l_ctrl'], corner_lift,
+                                     p['lower_fullness'])
+        return upper, lower, self._midline_fwd(w)
 
-        bow_sharpness  = self._gene(14)
-        lower_fullness = self._gene(15)
+    @instrumented("mouth.generate_group")
+    @cached_group("mouth")
+    def generate_group(self, normalize=False, compact=False, view_scale=1.0, show_points=False):
+        """
+        compact:     compact markup (see compact.py)
+        view_scale:  face units per unit of this group, sets the compact precision
+        show_points: append the hidden ctrl-points group (generate_points());
+                     ignored when compact
+        """
 
+        w = 1.0 if normalize else MOUTH_WIDTH
         lip_color = self.get_lip_color()
         stroke_w  = w * 0.008
 
-        corner_lift = self._midline_geometry(w)['corner_lift']
+        precision = precision_for_scale(view_scale) if compact else None
 
-        upper   = self.build_upper_lip(w, bow_h, valley_h, bow_x, ctrl, corner_lift, bow_sharpness)
-        lower   = self.build_lower_lip(w, lower_h, l_ctrl, corner_lift, lower_fullness)
-        midline = self._midline_fwd(w)
-        cp_group = self._ctrl_points_group(w, bow_h, valley_h, bow_x, ctrl, lower_h, l_ctrl,
-                                           bow_sharpness, lower_fullness)
+        upper, lower, midline = (path.to_svg(precision, compact) for path in self._paths(w))
+
+        if compact:
+            color = hex_color(lip_color)
+            sw = format_number(stroke_w, precision + 1)
+            return (f'<g class="p" fill="{color}" stroke="{color}" stroke-width="{sw}">'
+                    f'<path d="{upper}"/><path d="{lower}"/>'
+                    f'</g>'
+                    f'<path class="r" stroke-width="{sw}" d="{midline}"/>')
+
+        cp_group = self._ctrl_points_group(w, **self._lip_params(w)) if show_points else ""
 
         return f"""
 <!-- Upper lip -->
@@ -408,3 +412,27 @@ class TenderMouth:
 
 {cp_group}
 """
+
+    def shapes(self, normalize=False):
+        """
+        Both lips and the midline as raster.shape() geometry, in the same
+        space as generate_group(normalize=...).
+        """
+        w = 1.0 if normalize else MOUTH_WIDTH
+        lip_color = self.get_lip_color()
+        stroke_w  = w * 0.008
+        upper, lower, midline = self._paths(w)
+
+        return [
+            shape([upper], fill=lip_color, stroke=lip_color, stroke_width=stroke_w, round_joins=True),
+            shape([lower], fill=lip_color, stroke=lip_color, stroke_width=stroke_w, round_joins=True),
+            shape([midline], stroke=(0, 0, 0), stroke_width=stroke_w, round_joins=True),
+        ]
+
+    def generate_points(self, normalize=False, hidden=False):
+        """
+        The ctrl-points overlay alone, in the same space as
+        generate_group(normalize=...).  hidden=True adds style="display:none".
+        """
+        w = 1.0 if normalize else MOUTH_WIDTH
+        return self._ctrl_points_group(w, **self._lip_params(w), hidden=hidden)
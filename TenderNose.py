@@ -1,4 +1,9 @@
-from genes import Genome
+from genes import Genome, register_genes
+from compact import format_number, precision_for_scale
+from instrument import instrumented
+from part_cache import cached_group
+from paths import Path
+from raster import shape
 
 
 # =====================================================
@@ -18,6 +23,8 @@ from genes import Genome
 # Gene indices used by the nose: 120 – 143 (10 used, 14 spare)
 GENE_BASE = 120
 
+NOSE_GENES = register_genes("nose", range(GENE_BASE, GENE_BASE + 10))
+
 
 # =====================================================
 # TENDER NOSE
@@ -59,6 +66,7 @@ class TenderNose:
     # CONTROL POINTS
     # =====================================================
 
+    @instrumented("nose.get_control_points")
     def get_control_points(self):
         """
         Returns all named control points as a dict.
@@ -103,11 +111,7 @@ class TenderNose:
     # PATH BUILDERS
     # =====================================================
 
-    @staticmethod
-    def _f(x, y):
-        """Format a coordinate pair."""
-        return f"{x:.4f},{y:.4f}"
-
+    @instrumented("nose.bridge_path")
     def _bridge_path(self, cp, side):
         """
         Four-segment path for one bridge+nostril outline.
@@ -122,7 +126,6 @@ class TenderNose:
           4. Ala tip     → arch endpoint   (nostril curves back inward to base)
         """
         s   = side
-        f   = self._f
 
         bxt = cp['bridge_x_top']
         bx1 = cp['bridge_x_1']
@@ -167,15 +170,15 @@ class TenderNose:
         s4_c1 = (s * (ax - (ax - aex) * 0.22), ay + rh * 0.30)
         s4_c2 = (s * aex,                       ay + rh * 0.70)
 
-        return (
-            f"M {f(*P0)} "
-            f"C {f(*s1a_c1)} {f(*s1a_c2)} {f(*PA)} "
-            f"C {f(*s1b_c1)} {f(*s1b_c2)} {f(*P1)} "
-            f"C {f(*s2_c1)}  {f(*s2_c2)}  {f(*P2)} "
-            f"C {f(*s3_c1)}  {f(*s3_c2)}  {f(*P3)} "
-            f"C {f(*s4_c1)}  {f(*s4_c2)}  {f(*P4)}"
-        )
+        return (Path()
+                .move_to(*P0)
+                .curve_to(*s1a_c1, *s1a_c2, *PA)
+                .curve_to(*s1b_c1, *s1b_c2, *P1)
+                .curve_to(*s2_c1,  *s2_c2,  *P2)
+                .curve_to(*s3_c1,  *s3_c2,  *P3)
+                .curve_to(*s4_c1,  *s4_c2,  *P4))
 
+    @instrumented("nose.arch_path")
     def _arch_path(self, cp):
         """
         Two symmetric cubic beziers forming the nose-tip arch.
@@ -191,27 +194,24 @@ class TenderNose:
         td    = cp['tip_dip']
         tip_y = ay + td
 
-        f = self._f
-
         lc1 = (-asx * 0.45, ay + td * 0.5)
         lc2 = (-asx * 0.10, ay + td * 0.9)
         rc1 = ( asx * 0.10, ay + td * 0.9)
         rc2 = ( asx * 0.45, ay + td * 0.5)
 
-        return (
-            f"M {f(-asx, ay)} "
-            f"C {f(*lc1)} {f(*lc2)} {f(0.0, tip_y)} "
-            f"C {f(*rc1)} {f(*rc2)} {f(asx, ay)}"
-        )
+        return (Path()
+                .move_to(-asx, ay)
+                .curve_to(*lc1, *lc2, 0.0, tip_y)
+                .curve_to(*rc1, *rc2, asx, ay))
 
     # =====================================================
     # GROUP GENERATION
     # =====================================================
 
-    def _ctrl_points_group(self, cp):
+    def _ctrl_points_group(self, cp, hidden=True):
         """
-        Hidden group (class="ctrl-points") showing all named anchor points.
-        Toggled visible by the UI without regenerating the SVG.
+        Group (class="ctrl-points") showing all named anchor points;
+        hidden=True adds style="display:none".
 
         Red  = anchor points on the path
         Blue = y-level guide lines (show the horizontal slice at each bridge width)
@@ -244,8 +244,10 @@ class TenderNose:
                 f' stroke="blue" stroke-width="{sw}" stroke-dasharray="0.03 0.02"/>'
             )
 
+        style = ' style="display:none"' if hidden else ''
+
         return f"""
-<g class="ctrl-points" style="display:none">
+<g class="ctrl-points"{style}>
   <!-- y-level guide lines (blue dashes) -->
   {hline(bxt, 0.0)}
   {hline(bx1, buy)}
@@ -274,20 +276,42 @@ class TenderNose:
   {dot(asx, arch_y)}
 </g>"""
 
-    def generate_group(self, max_bridge_x_top=None):
+    def _clamped_control_points(self, max_bridge_x_top=None):
+        """get_control_points() with the bridge top narrowed to max_bridge_x_top."""
         cp = self.get_control_points()
 
         if max_bridge_x_top is not None:
             cp['bridge_x_top'] = min(cp['bridge_x_top'], max_bridge_x_top)
             # keep bridge widths monotonically non-decreasing
             cp['bridge_x_1'] = max(cp['bridge_x_1'], cp['bridge_x_top'])
+        return cp
+
+    @instrumented("nose.generate_group")
+    @cached_group("nose")
+    def generate_group(self, max_bridge_x_top=None, compact=False, view_scale=1.0,
+                       show_points=False):
+        """
+        compact:     compact markup (see compact.py)
+        view_scale:  face units per nose height, sets the compact precision
+        show_points: append the hidden ctrl-points group (generate_points());
+                     ignored when compact
+        """
+        cp = self._clamped_control_points(max_bridge_x_top)
+
+        precision = precision_for_scale(view_scale) if compact else None
 
-        left_path  = self._bridge_path(cp, side=-1)
-        right_path = self._bridge_path(cp, side=+1)
-        arch_path  = self._arch_path(cp)
-        ctrl_svg   = self._ctrl_points_group(cp)
+        left_path  = self._bridge_path(cp, side=-1).to_svg(precision, compact)
+        right_path = self._bridge_path(cp, side=+1).to_svg(precision, compact)
+        arch_path  = self._arch_path(cp).to_svg(precision, compact)
 
         sw = self.STROKE
+
+        if compact:
+            return (f'<g class="r" stroke-width="{format_number(sw, precision + 1)}">'
+                    f'<path d="{left_path}"/><path d="{right_path}"/><path d="{arch_path}"/>'
+                    f'</g>')
+
+        ctrl_svg = self._ctrl_points_group(cp) if show_points else ""
         attr = f'fill="none" stroke="black" stroke-width="{sw}" stroke-linecap="round"'
 
         return f"""
@@ -302,3 +326,19 @@ class TenderNose:
 
 {ctrl_svg}
 """
+
+    def shapes(self, max_bridge_x_top=None):
+        """
+        The three nose lines as raster.shape() geometry, in the same space
+        as generate_group().
+        """
+        cp = self._clamped_control_points(max_bridge_x_top)
+        paths = [self._bridge_path(cp, side=-1), self._bridge_path(cp, side=+1), self._arch_path(cp)]
+        return [shape(paths, stroke=(0, 0, 0), stroke_width=self.STROKE, round_joins=True)]
+
+    def generate_points(self, max_bridge_x_top=None, hidden=False):
+        """
+        The ctrl-points overlay alone, for the same arguments as
+        generate_group().  hidden=True adds style="display:none".
+        """
+        return self._ctrl_points_group(self._clamped_control_points(max_bridge_x_top), hidden)
@@ -0,0 +1,179 @@
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from TenderBrows import TenderBrows
+from TenderEyes import MinimalEyeGenome
+from TenderFace import FACE_GENES, NUM_GENES, generate_face_svg
+from TenderHead import MinimalHeadGenome
+from TenderMouth import TenderMouth
+from TenderNose import TenderNose
+from genes import Genome
+from part_cache import part_caching
+
+
+# =====================================================
+# BENCHMARK SUITE
+# =====================================================
+#
+# Times the full face pipeline and every part generator on the same
+# fixed-seed genomes.  Per case:
+#
+#   faces_per_sec, p50_us, p99_us : from per-call wall times
+#   bytes_per_face                : average output length
+#   alloc_peak_bytes              : mean peak traced memory per call
+#                                   (tracemalloc, separate smaller pass)
+#
+# The part cache is switched off while measuring, so every call renders.
+# Results are written as JSON; compare_results() diffs two runs.
+#
+#   python benchmark.py --out before.json
+#   python benchmark.py --out after.json --compare before.json
+
+BENCH_SEED = 20240
+# Genome i of a run is Genome(seed=BENCH_SEED + i).
+
+DEFAULT_FACES = 300
+DEFAULT_WARMUP = 20
+DEFAULT_ALLOC_FACES = 50
+# tracemalloc slows calls down several times; its pass uses fewer faces.
+
+CASES = {
+    "face":         lambda genome, i: generate_face_svg(str(i), genome=genome),
+    "face.compact": lambda genome, i: generate_face_svg(str(i), genome=genome, compact=True),
+    "face.defs":    lambda genome, i: generate_face_svg(str(i), genome=genome, use_defs=True),
+    "eyes":         lambda genome, i: MinimalEyeGenome(genome).generate_group(
+                        clip_id=f"eyeClip_{i}", normalize=True),
+    "mouth":        lambda genome, i: TenderMouth(genome).generate_group(normalize=True),
+    "brows":        lambda genome, i: TenderBrows(genome).generate_group(),
+    "nose":         lambda genome, i: TenderNose(genome).generate_group(),
+    "head":         lambda genome, i: MinimalHeadGenome(genome).generate_group(),
+}
+
+
+def _genomes(n, seed=BENCH_SEED):
+    # Fresh objects per pass, so no case sees another's cached expression
+    return [Genome(num_genes=NUM_GENES, seed=seed + i, genes=FACE_GENES) for i in range(n)]
+
+
+def _time_case(case, n, warmup):
+    for i, genome in enumerate(_genomes(warmup, seed=BENCH_SEED - warmup)):
+        case(genome, i)
+
+    genomes = _genomes(n)
+    latencies = np.empty(n)
+    total_bytes = 0
+    start = time.perf_counter()
+    for i, genome in enumerate(genomes):
+        t0 = time.perf_counter()
+        output = case(genome, i)
+        latencies[i] = time.perf_counter() - t0
+        total_bytes += len(output)
+    elapsed = time.perf_counter() - start
+
+    return dict(
+        faces=n,
+        faces_per_sec=n / elapsed,
+        p50_us=float(np.percentile(latencies, 50)) * 1e6,
+        p99_us=float(np.percentile(latencies, 99)) * 1e6,
+        bytes_per_face=total_bytes / n,
+    )
+
+
+def _allocations(case, n):
+    """Mean and max peak traced bytes of one call."""
+    genomes = _genomes(n)
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i, genome in enumerate(genomes):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            case(genome, i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return dict(alloc_peak_bytes=sum(peaks) / n, alloc_peak_max_bytes=max(peaks))
+
+
+def run_benchmarks(names=None, n=DEFAULT_FACES, warmup=DEFAULT_WARMUP,
+                   alloc_faces=DEFAULT_ALLOC_FACES):
+    """
+    Runs the named CASES (all by default).
+    Returns {"meta": {...}, "cases": {name: {...}}}, JSON-serialisable.
+    """
+    names = list(CASES) if names is None else names
+    with part_caching(False):
+        cases = {}
+        for name in names:
+            result = _time_case(CASES[name], n, warmup)
+            if alloc_faces:
+                result.update(_allocations(CASES[name], alloc_faces))
+            cases[name] = result
+
+    meta = dict(
+        seed=BENCH_SEED, faces=n, warmup=warmup, alloc_faces=alloc_faces,
+        python=platform.python_version(), numpy=np.__version__,
+        machine=platform.machine(), platform=platform.platform(),
+        time=time.strftime("%Y-%m-%dT%H:%M:%S"),
+    )
+    return {"meta": meta, "cases": cases}
+
+
+def format_results(results):
+    """run_benchmarks() results as a plain-text table."""
+    lines = ["case            faces/s    p50 us    p99 us  bytes/face  peak alloc"]
+    for name, row in results["cases"].items():
+        alloc = f"{row['alloc_peak_bytes']:>11.0f}" if "alloc_peak_bytes" in row else f"{'-':>11}"
+        lines.append(f"{name:<14} {row['faces_per_sec']:>8.0f} {row['p50_us']:>9.1f} "
+                     f"{row['p99_us']:>9.1f} {row['bytes_per_face']:>11.0f} {alloc}")
+    return "\n".join(lines)
+
+
+def compare_results(old, new):
+    """
+    Per-case ratios new / old for the cases both runs contain, as a
+    plain-text table; throughput above 1.0 and latency below are better.
+    """
+    lines = ["case            faces/s     p50      p99    bytes"]
+    for name, row in new["cases"].items():
+        base = old["cases"].get(name)
+        if base is None:
+            continue
+        ratios = [row[key] / base[key]
+                  for key in ("faces_per_sec", "p50_us", "p99_us", "bytes_per_face")]
+        lines.append(f"{name:<14} " + " ".join(f"{ratio:>7.3f}x" for ratio in ratios))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Face generation benchmarks")
+    parser.add_argument("cases", nargs="*", help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("-n", type=int, default=DEFAULT_FACES, help="faces per case")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--alloc-faces", type=int, default=DEFAULT_ALLOC_FACES,
+                        help="faces in the tracemalloc pass (0 to skip)")
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    results = run_benchmarks(args.cases or None, args.n, args.warmup, args.alloc_faces)
+    print(format_results(results))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print()
+            print(compare_results(json.load(f), results))
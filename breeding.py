@@ -0,0 +1,221 @@
+import numpy as np
+
+from population import GenomePopulation
+
+
+# =====================================================
+# BREEDING MODEL
+# =====================================================
+#
+# Every child receives one gamete from each parent:
+#   child chromosome1 ← gamete of parent A
+#   child chromosome2 ← gamete of parent B
+#
+# A gamete is produced by meiosis: starting from a randomly chosen
+# chromosome of the parent, the copy switches to the other chromosome at
+# each crossover point.  An allele is always copied whole, so its
+# dominance travels with its gene value.
+#
+# Mutation then replaces individual alleles (dominance and value) with
+# fresh random bytes.
+#
+# All functions work on whole populations at once and take `rng`, which
+# may be a seed or a numpy Generator (anything numpy.random.default_rng
+# accepts).
+
+DEFAULT_CHUNK_SIZE = 4096
+# Children bred per vectorised pass.  Small enough that the temporaries
+# of one pass stay in cache, large enough to amortise numpy call overhead.
+
+
+# =====================================================
+# MEIOSIS
+# =====================================================
+
+def _crossover_parity(size, num_genes, crossover_points, rng, start=None):
+    """
+    (size, num_genes) bool array: True where the gamete has switched
+    chromosome an odd number of times at or before that gene.
+
+    crossover_points: int → that many random points per gamete
+                      sequence of gene indices → the same fixed points for all
+    start           : optional (size, 1) bool, True for gametes that start
+                      on chromosome2 (a cut before gene 0)
+    """
+    gene = np.arange(num_genes, dtype=np.int16)
+    cuts = []
+
+    if start is not None:
+        # num_genes lies past the last gene: no cut
+        cuts.append(np.where(start, 0, num_genes).astype(np.int16))
+
+    if np.ndim(crossover_points) == 0:
+        count = int(crossover_points)
+        if count < 0:
+            raise ValueError("crossover_points must be non-negative")
+        if count > 0 and num_genes >= 2:
+            # Cut before gene c (1 … num_genes-1); repeated cuts cancel out
+            cuts.extend(rng.integers(1, num_genes, size=(count, size, 1), dtype=np.int16))
+    else:
+        fixed = np.asarray(crossover_points, dtype=np.int16)
+        if fixed.size and (fixed.min() < 1 or fixed.max() >= num_genes):
+            raise ValueError("Fixed crossover points must lie in 1 … num_genes-1")
+        cuts.extend(fixed.reshape(-1, 1, 1))
+
+    parity = np.zeros((size, num_genes), dtype=bool)
+    if not cuts:
+        return parity
+
+    # One comparison and one xor per cut, into preallocated buffers
+    np.greater_equal(gene, cuts[0], out=parity)
+    step = np.empty_like(parity)
+    for cut in cuts[1:]:
+        np.greater_equal(gene, cut, out=step)
+        parity ^= step
+
+    return parity
+
+
+def _gene_words(alleles):
+    """
+    Views an (N, num_genes, 2, 2) uint8 array as (N, num_genes) uint32:
+    one word per gene holding both alleles, chromosome1 in the low half.
+    """
+    size, num_genes = alleles.shape[:2]
+    alleles = np.ascontiguousarray(alleles)
+    return alleles.reshape(size, num_genes, 4).view(np.uint32).reshape(size, num_genes)
+
+
+def _gamete_words(words, crossover_points, rng):
+    """
+    Gametes from (N, num_genes) gene words, as (N, num_genes) uint32 with
+    the chosen allele in the low 16 bits; the high 16 bits are left
+    over from the shift and must be masked or shifted out by the caller.
+    Selecting a chromosome is a 0- or 16-bit shift.
+    """
+    size, num_genes = words.shape
+
+    start = rng.integers(0, 2, size=(size, 1), dtype=np.uint8).astype(bool)
+    shift = _crossover_parity(size, num_genes, crossover_points, rng, start).view(np.uint8)
+    shift *= 16     # numpy multiplies uint8 far faster than it shifts it
+    # uint32 >> uint8 stays uint32; no separate widening pass
+    return words >> shift
+
+
+def meiosis(alleles, crossover_points=1, rng=None):
+    """
+    One gamete per genome.
+
+    alleles: (N, num_genes, 2, 2) array (GenomePopulation.alleles)
+    Returns an (N, num_genes, 2) array of (dominance, value) pairs.
+    """
+    rng = np.random.default_rng(rng)
+    size, num_genes = alleles.shape[:2]
+
+    gametes = _gamete_words(_gene_words(alleles), crossover_points, rng).astype(np.uint16)
+    return gametes.view(np.uint8).reshape(size, num_genes, 2)
+
+
+# =====================================================
+# MUTATION
+# =====================================================
+
+def mutate(alleles, mutation_rate, rng=None):
+    """
+    Replaces alleles in place with random (dominance, value) pairs.
+
+    alleles       : (N, num_genes, 2, 2) uint8 array, modified in place
+    mutation_rate : probability per allele — a scalar, or one rate per gene
+                    (length num_genes) for per-gene rates
+    Returns the number of mutated alleles.
+    """
+    rng = np.random.default_rng(rng)
+    size, num_genes = alleles.shape[:2]
+    rates = np.asarray(mutation_rate, dtype=np.float64)
+
+    if rates.ndim == 0:
+        rate = float(rates)
+        if rate <= 0:
+            return 0
+
+        # Scalar rate: draw only the mutation count and positions,
+        # O(mutations) instead of one random number per allele.
+        total = size * num_genes * 2
+        count = rng.binomial(total, min(rate, 1.0))
+        positions = rng.choice(total, size=count, replace=False)
+        n, gene, chromosome = np.unravel_index(positions, (size, num_genes, 2))
+        alleles[n, gene, chromosome] = rng.integers(0, 256, size=(count, 2), dtype=np.uint8)
+        return count
+
+    if rates.shape != (num_genes,):
+        raise ValueError("Per-gene mutation rates must have length num_genes")
+
+    mask = rng.random((size, num_genes, 2), dtype=np.float32) < rates[None, :, None]
+    count = int(mask.sum())
+    alleles[mask] = rng.integers(0, 256, size=(count, 2), dtype=np.uint8)
+    return count
+
+
+# =====================================================
+# BREEDING
+# =====================================================
+
+def random_pairs(num_parents, num_children, rng=None):
+    """
+    (num_children, 2) array of parent indices drawn uniformly,
+    never pairing a parent with itself when more than one parent exists.
+    """
+    rng = np.random.default_rng(rng)
+    a = rng.integers(0, num_parents, size=num_children)
+
+    if num_parents < 2:
+        return np.stack([a, a], axis=1)
+
+    # Offset in 1 … num_parents-1 guarantees b != a
+    b = (a + rng.integers(1, num_parents, size=num_children)) % num_parents
+    return np.stack([a, b], axis=1)
+
+
+def breed(parents, pairs=None, num_children=None, crossover_points=1,
+          mutation_rate=0.0, seed=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Breeds a new GenomePopulation from `parents`.
+
+    pairs            : (M, 2) parent indices, one row per child.
+                       If None, num_children random pairs are drawn
+                       (default: as many children as parents).
+    crossover_points : int (random points per gamete) or fixed gene indices
+    mutation_rate    : scalar or per-gene rates, see mutate()
+    seed             : seed or numpy Generator; fixes the whole run
+    """
+    rng = np.random.default_rng(seed)
+
+    if pairs is None:
+        if num_children is None:
+            num_children = parents.size
+        pairs = random_pairs(parents.size, num_children, rng)
+    else:
+        pairs = np.asarray(pairs, dtype=np.int64)
+        if pairs.ndim != 2 or pairs.shape[1] != 2:
+            raise ValueError("pairs must have shape (M, 2)")
+
+    num_genes = parents.num_genes
+    parent_words = _gene_words(parents.alleles)
+
+    children = np.empty((len(pairs), num_genes, 2, 2), dtype=np.uint8)
+    child_words = _gene_words(children)
+
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        stop = start + len(chunk)
+
+        # Gamete of parent A → chromosome1 (low half), parent B → chromosome2;
+        # shifting B left by 16 drops its leftover bits, A's are masked off
+        out = child_words[start:stop]
+        np.left_shift(_gamete_words(parent_words[chunk[:, 1]], crossover_points, rng), 16, out=out)
+        gametes = _gamete_words(parent_words[chunk[:, 0]], crossover_points, rng)
+        gametes &= 0xFFFF
+        out |= gametes
+        mutate(children[start:stop], mutation_rate, rng)
+
+    return GenomePopulation(children)
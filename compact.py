@@ -0,0 +1,107 @@
+import math
+
+
+# =====================================================
+# COMPACT SVG OUTPUT
+# =====================================================
+#
+# Shared pieces of the compact=True output mode:
+#
+#   - numbers rounded to the coarsest precision that stays within
+#     COMPACT_TOLERANCE once the part is scaled into the face, and written
+#     without redundant zeros (0.50 → .5)
+#   - relative path commands (see paths.Path.to_svg)
+#   - the repeated fill/stroke attribute sets replaced by the CSS classes
+#     in COMPACT_STYLE, which the document wrapping the parts must include
+#   - no template whitespace
+
+COMPACT_TOLERANCE = 0.02
+# Maximum rounding error in face (viewBox) units: 0.125 px for a face
+# drawn 1000 px tall.
+
+MAX_PRECISION = 4
+# Upper bound on compact decimal places (0.0001); keeps every rounded
+# value's repr() in fixed-point notation.
+
+COMPACT_STYLE = (
+    "<style>"
+    ".l{fill:none;stroke:#000}"
+    ".r{fill:none;stroke:#000;stroke-linecap:round;stroke-linejoin:round}"
+    ".k{fill:#000}"
+    ".w{fill:#fff}"
+    ".p{stroke-linejoin:round}"
+    ".o{stroke:#000;stroke-width:.5}"
+    "</style>"
+)
+# l: eyelid lines   r: nose and mouth lines   k: brows, pupils
+# w: sclera         p: lips                   o: head outline
+
+
+def precision_for_scale(scale, tolerance=COMPACT_TOLERANCE):
+    """
+    Decimal places for coordinates drawn at `scale` face units per local
+    unit: rounding moves a point by at most half a step, times scale.
+    """
+    places = math.ceil(math.log10(abs(scale) / (2 * tolerance)))
+    return min(max(0, places), MAX_PRECISION)
+
+
+def format_number(value, precision):
+    """Shortest text of `value` rounded to `precision` decimals (0.50 → .5)."""
+    text = f"{value:.{precision}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    if text.startswith("0."):
+        return text[1:]
+    if text.startswith("-0."):
+        return "-" + text[2:]
+    if text == "-0":
+        return "0"
+    return text
+
+
+STEP_TEXT_ENTRIES = 1 << 16
+# Texts cached per precision by step_text(); a full table starts over.
+
+
+class _StepTexts(dict):
+    """{integer count of 10**-precision steps: format_number() text}, filled on lookup."""
+
+    def __init__(self, precision):
+        super().__init__()
+        self.precision = precision
+
+    def __missing__(self, steps):
+        if len(self) >= STEP_TEXT_ENTRIES:
+            self.clear()
+        text = self[steps] = format_number(steps / 10 ** self.precision, self.precision)
+        return text
+
+
+_STEP_TEXTS = [_StepTexts(precision) for precision in range(MAX_PRECISION + 1)]
+
+
+def step_text(precision):
+    """
+    Lookup from an integer step count to the text of steps * 10**-precision;
+    step_text(2)(-50) is "-.5".
+    Quantised coordinates repeat across faces, so each value is shortened
+    once; map(step_text(p), steps) formats a whole path.
+    """
+    return _STEP_TEXTS[precision].__getitem__
+
+
+def join_numbers(numbers):
+    """Numbers as one string, omitting the space before a minus sign."""
+    text = numbers[0]
+    for number in numbers[1:]:
+        text += number if number[0] == "-" else " " + number
+    return text
+
+
+def hex_color(rgb):
+    """(r, g, b) → "#rrggbb", or "#rgb" when each channel repeats a digit."""
+    text = "%02x%02x%02x" % tuple(rgb)
+    if text[0::2] == text[1::2]:
+        text = text[0::2]
+    return "#" + text
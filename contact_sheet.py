@@ -0,0 +1,71 @@
+import itertools
+
+
+# =====================================================
+# STREAMING SVG GRID WRITER
+# =====================================================
+#
+# Writes a grid of SVG fragments (one per cell) straight to a file-like
+# object.  Cells are consumed from an iterable and flushed in small
+# chunks, so memory stays constant no matter how many cells the sheet
+# holds — the document is never assembled as one string.
+#
+# Each fragment is placed in its own <g transform="translate(x,y)">, so
+# fragments must use ids that are unique across the sheet (clip paths).
+
+DEFAULT_CHUNK_SIZE = 64
+# Cells buffered per write() call.
+
+
+def write_svg_grid(out, cells, count, cols, cell_width, cell_height,
+                   chunk_size=DEFAULT_CHUNK_SIZE, preamble=""):
+    """
+    Streams `count` cells into one SVG document on `out`.
+
+    out         : any object with a write(str) method
+    cells       : iterable of SVG fragments, row-major; only the first
+                  `count` are used
+    count       : number of cells (needed up front for the viewBox)
+    cols        : cells per row
+    cell_width,
+    cell_height : cell size in user units
+    preamble    : markup written once before the cells (e.g. a <style>)
+
+    Returns the number of cells written.
+    """
+    rows = -(-count // cols)   # ceiling division
+    total_width = cols * cell_width
+    total_height = rows * cell_height
+
+    out.write(f"""
+<svg xmlns="http://www.w3.org/2000/svg"
+     viewBox="0 0 {total_width} {total_height}">
+{preamble}""")
+
+    written = 0
+    chunk = []
+
+    # islice stops before pulling cell count + 1 from a lazy generator
+    for fragment in itertools.islice(cells, count):
+        row, col = divmod(written, cols)
+        tx = col * cell_width
+        ty = row * cell_height
+
+        chunk.append(f"""
+<g transform="translate({tx},{ty})">
+{fragment}
+</g>
+""")
+        written += 1
+
+        if len(chunk) >= chunk_size:
+            out.write("".join(chunk))
+            chunk.clear()
+
+    if chunk:
+        out.write("".join(chunk))
+
+    out.write("""
+</svg>
+""")
+    return written
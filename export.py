@@ -0,0 +1,214 @@
+import argparse
+import calendar
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from population import GenomePopulation, save_population
+from TenderFace import FACE_GENES, NUM_GENES, generate_faces
+
+
+# =====================================================
+# BULK EXPORT
+# =====================================================
+#
+# Writes N faces as fixed-size shards, one shard per process-pool task:
+#
+#   out_dir/manifest.json          export settings + every finished shard
+#   out_dir/shard-00000/           face-00000000.svg ...   (format "dir")
+#   out_dir/shard-00000.zip|.tar   the same files, archived
+#   out_dir/shard-00000.tfgp       the shard's genomes (population file)
+#   out_dir/shard-00000.json       shard manifest, written last
+#
+# Shard k draws its genomes from SeedSequence(seed, spawn_key=(k,)), so
+# every shard is reproducible on its own, whatever the worker count.
+# Shard outputs are written under a temporary name and renamed into
+# place; a shard counts as finished once its .json exists, so re-running
+# the same export after an interruption only builds the missing shards.
+
+DEFAULT_SHARD_SIZE = 1000
+FORMATS = ("dir", "zip", "tar")
+
+MANIFEST = "manifest.json"
+
+ARCHIVE_DATE = (1980, 1, 1, 0, 0, 0)
+# Timestamp of every archived file (the earliest a zip entry can hold),
+# so re-exporting the same settings gives byte-identical archives.
+
+
+def _shard_name(shard):
+    return f"shard-{shard:05d}"
+
+
+def _write_atomic(path, data):
+    mode = "wb" if isinstance(data, bytes) else "w"
+    with open(path + ".tmp", mode) as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def _write_faces(path, fmt, files):
+    """Writes {name: svg} as a directory or archive at `path`, atomically."""
+    tmp = path + ".tmp"
+    if os.path.isdir(tmp):
+        shutil.rmtree(tmp)
+
+    if fmt == "dir":
+        os.makedirs(tmp)
+        for name, svg in files.items():
+            with open(os.path.join(tmp, name), "w") as f:
+                f.write(svg)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+    elif fmt == "zip":
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, svg in files.items():
+                info = zipfile.ZipInfo(name, date_time=ARCHIVE_DATE)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                archive.writestr(info, svg)
+    else:
+        with tarfile.open(tmp, "w") as archive:
+            for name, svg in files.items():
+                data = svg.encode()
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = calendar.timegm(ARCHIVE_DATE)
+                archive.addfile(info, io.BytesIO(data))
+
+    os.replace(tmp, path)
+
+
+def export_shard(out_dir, shard, settings):
+    """
+    Builds and writes one shard (run in a worker process).
+    Returns the shard manifest dict.
+    """
+    first = shard * settings['shard_size']
+    count = min(settings['shard_size'], settings['n'] - first)
+    name = _shard_name(shard)
+
+    rng = np.random.default_rng(np.random.SeedSequence(settings['seed'], spawn_key=(shard,)))
+    population = GenomePopulation.random(count, NUM_GENES, seed=rng, genes=FACE_GENES)
+
+    svgs = generate_faces(genomes=population, use_defs=settings['use_defs'],
+                          compact=settings['compact'])
+    files = {f"face-{first + i:08d}.svg": svg for i, svg in enumerate(svgs)}
+
+    faces = name if settings['format'] == "dir" else f"{name}.{settings['format']}"
+    _write_faces(os.path.join(out_dir, faces), settings['format'], files)
+
+    genomes = f"{name}.tfgp"
+    save_population(os.path.join(out_dir, genomes + ".tmp"), population)
+    os.replace(os.path.join(out_dir, genomes + ".tmp"), os.path.join(out_dir, genomes))
+
+    manifest = dict(
+        shard=shard, first=first, count=count,
+        seed=settings['seed'], spawn_key=[shard],
+        faces=faces, files=list(files), genomes=genomes,
+        bytes=sum(len(svg.encode()) for svg in files.values()),
+    )
+    _write_atomic(os.path.join(out_dir, f"{name}.json"), json.dumps(manifest, indent=1))
+    return manifest
+
+
+def _read_shard(out_dir, shard):
+    path = os.path.join(out_dir, f"{_shard_name(shard)}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def export_faces(out_dir, n, seed=0, shard_size=DEFAULT_SHARD_SIZE, workers=None,
+                 fmt="dir", use_defs=False, compact=False, progress=None):
+    """
+    Exports n faces to out_dir with a process pool of `workers` processes
+    (default: one per core).  Shards already finished by an earlier run
+    with the same settings are kept; different settings raise ValueError.
+
+    progress: optional callable(done_shards, total_shards, manifest)
+    Returns the export manifest.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if n < 0:
+        raise ValueError(f"n must be at least 0, got {n}")
+    if shard_size <= 0:
+        raise ValueError(f"shard_size must be positive, got {shard_size}")
+
+    settings = dict(n=n, seed=seed, shard_size=shard_size, format=fmt,
+                    use_defs=use_defs, compact=compact, num_genes=NUM_GENES)
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)['settings']
+        if previous != settings:
+            raise ValueError(f"{out_dir} holds an export with different settings: {previous}")
+
+    num_shards = -(-n // shard_size)
+    shards = {shard: _read_shard(out_dir, shard) for shard in range(num_shards)}
+    pending = [shard for shard, manifest in shards.items() if manifest is None]
+
+    def save_manifest():
+        done = [manifest for manifest in shards.values() if manifest is not None]
+        manifest = dict(settings=settings, complete=len(done) == num_shards, shards=done)
+        _write_atomic(manifest_path, json.dumps(manifest, indent=1))
+        return manifest
+
+    save_manifest()
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(export_shard, out_dir, shard, settings) for shard in pending]
+            for future in as_completed(futures):
+                manifest = future.result()
+                shards[manifest['shard']] = manifest
+                if progress is not None:
+                    progress(sum(m is not None for m in shards.values()), num_shards, manifest)
+
+    return save_manifest()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Export faces as sharded SVG files")
+    parser.add_argument("out_dir")
+    parser.add_argument("-n", type=int, required=True, help="number of faces")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="default: one per core")
+    parser.add_argument("--format", choices=FORMATS, default="dir")
+    parser.add_argument("--use-defs", action="store_true")
+    parser.add_argument("--compact", action="store_true")
+    args = parser.parse_args()
+    if args.n < 0:
+        parser.error("-n must be at least 0")
+    if args.shard_size <= 0:
+        parser.error("--shard-size must be positive")
+    if args.workers is not None and args.workers <= 0:
+        parser.error("--workers must be positive")
+
+    start = time.perf_counter()
+
+    def report(done, total, shard):
+        print(f"shard {shard['shard']:>5}  {done}/{total}  "
+              f"{shard['count']} faces  {shard['bytes'] / 1e6:.1f} MB")
+
+    try:
+        manifest = export_faces(args.out_dir, args.n, args.seed, args.shard_size, args.workers,
+                                args.format, args.use_defs, args.compact, progress=report)
+    except ValueError as error:
+        parser.error(str(error))
+
+    elapsed = time.perf_counter() - start
+    print(f"{args.n} faces in {len(manifest['shards'])} shards, {elapsed:.1f} s")
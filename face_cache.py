@@ -0,0 +1,120 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from genes import gene_key
+
+
+# =====================================================
+# FACE CACHE
+# =====================================================
+#
+# Bounded LRU memo of rendered faces.  A face depends only on
+#
+#   - the expressed gene vector
+#   - the skin genes, which are read as the average of both alleles
+#     (Genome.get_gene_avg), so their two values are summed into the key
+#   - the render options (face_id, use_defs, compact, …)
+#
+# face_key() hashes exactly that, so genomes that differ only in recessive
+# alleles share an entry.  The cache is capped both by entry count and by
+# the total size of the stored values; the least recently used entries
+# are evicted first.  All methods are thread-safe.
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def face_key(genome, **options):
+    """
+    16-byte digest of everything that determines a rendered face:
+    expressed genes, averaged skin genes and the keyword render options.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(bytes(genome.expressed()))
+    for total in gene_key(genome, "skin"):
+        digest.update(total.to_bytes(2, "little"))
+    digest.update(repr(sorted(options.items())).encode())
+    return digest.digest()
+
+
+class FaceCache:
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        max_entries: maximum number of cached faces
+        max_bytes  : maximum total len() of the cached values
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached value for `key` (now most recently used), or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Stores `value` and evicts least recently used entries until both
+        caps hold.  Values larger than max_bytes are not stored.
+        """
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+
+            self._entries[key] = value
+            self.bytes += size
+
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def get_or_render(self, key, render):
+        """Cached value for `key`, calling render() and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = render()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drops every entry; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Counters and occupancy as a dict (JSON-serialisable)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
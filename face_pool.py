@@ -0,0 +1,133 @@
+import collections
+import random
+import threading
+import time
+
+
+# =====================================================
+# BACKGROUND PRE-GENERATION
+# =====================================================
+#
+# Ring buffer of ready-made pages of random faces, kept full by
+# background threads so a request for random faces only pops a page.
+#
+#   - capacity        : pages held at most
+#   - low_watermark   : workers sleep until the buffer drains to this
+#                       depth, then refill it to capacity
+#   - cpu_share       : fraction of one core each worker may use; after
+#                       rendering for t seconds it sleeps t × (1 − share) / share
+#
+# A page is (base seed, faces); render_page(seed) must be reproducible,
+# so a face from the pool can be rebuilt (or its overlay fetched) later.
+# pop() never blocks: on an empty buffer it returns None and the caller
+# renders on demand.
+
+DEFAULT_CAPACITY = 32
+DEFAULT_LOW_WATERMARK = 8
+DEFAULT_POOL_WORKERS = 1
+DEFAULT_CPU_SHARE = 0.5
+
+
+class FacePool:
+
+    def __init__(self, render_page, capacity=DEFAULT_CAPACITY,
+                 low_watermark=DEFAULT_LOW_WATERMARK, workers=DEFAULT_POOL_WORKERS,
+                 cpu_share=DEFAULT_CPU_SHARE):
+        """
+        render_page: callable(seed) → list of face SVGs
+        """
+        if not 0 <= low_watermark < capacity:
+            raise ValueError("low_watermark must be in [0, capacity)")
+        if not 0 < cpu_share <= 1:
+            raise ValueError("cpu_share must be in (0, 1]")
+
+        self.render_page = render_page
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self.workers = workers
+        self.cpu_share = cpu_share
+
+        self._pages = collections.deque(maxlen=capacity)
+        self._condition = threading.Condition()
+        self._refilling = True
+        self._stopped = False
+        self._threads = []
+
+        self.hits = 0
+        self.misses = 0
+        self.produced = 0
+
+    def __len__(self):
+        return len(self._pages)
+
+    def start(self):
+        """Starts the background workers (daemon threads)."""
+        self._stopped = False
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"face-pool-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stops the workers after their current page."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def pop(self):
+        """The oldest ready page as (seed, faces), or None when drained."""
+        with self._condition:
+            if not self._pages:
+                self.misses += 1
+                self._refilling = True
+                self._condition.notify_all()
+                return None
+
+            page = self._pages.popleft()
+            self.hits += 1
+            if len(self._pages) <= self.low_watermark and not self._refilling:
+                self._refilling = True
+                self._condition.notify_all()
+            return page
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._stopped and not self._refilling:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+
+            start = time.perf_counter()
+            seed = random.randrange(2 ** 31)
+            page = (seed, self.render_page(seed))
+            elapsed = time.perf_counter() - start
+
+            with self._condition:
+                if len(self._pages) < self.capacity:
+                    self._pages.append(page)
+                    self.produced += 1
+                if len(self._pages) >= self.capacity:
+                    self._refilling = False
+
+            if self.cpu_share < 1:
+                time.sleep(elapsed * (1 - self.cpu_share) / self.cpu_share)
+
+    def stats(self):
+        """Depth and counters as a dict (JSON-serialisable)."""
+        with self._condition:
+            lookups = self.hits + self.misses
+            return {
+                'depth': len(self._pages),
+                'capacity': self.capacity,
+                'low_watermark': self.low_watermark,
+                'workers': len(self._threads),
+                'refilling': self._refilling,
+                'produced': self.produced,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -1,4 +1,203 @@
+import functools
+import itertools
 import random
+import struct
+
+# =====================================================
+# SKIN PALETTE
+# =====================================================
+
+SKIN_PALETTE = [
+    (117, 58, 15),   # darkest brown
+    (145, 75, 50),   # dark brown
+    (182, 107, 62),  # medium brown
+    (195, 124, 77),  # light brown
+    (210, 153, 108), # very light brown
+    (245, 204, 171), # near fair
+    (249, 213, 202)  # pinkish fair
+]
+
+# =====================================================
+# GENE MAP
+# =====================================================
+# Every part module declares the gene indices it reads with
+# register_genes() at import time.  Genome uses the union to materialise
+# only consumed genes, batch code uses it to slice exactly the columns
+# a part needs, and gene_usage_report() flags unused or overlapping indices.
+
+GENE_MAP = {}
+GENE_USES = {}
+GENE_AVERAGED = set()
+
+
+def register_genes(part, indices, uses=(), averaged=False):
+    """
+    Declares that `part` reads the genes at `indices`.
+
+    uses:     names of other registered groups whose genes the part also
+              reads (e.g. the mouth reads "skin" for the lip color).  Those
+              are included by genes_for() but not counted as overlaps.
+    averaged: the genes are read with get_gene_avg() (both alleles)
+              rather than as expressed values.
+
+    Returns the sorted tuple of indices, for use as a module constant.
+    """
+    GENE_MAP[part] = tuple(sorted(set(indices)))
+    GENE_USES[part] = tuple(uses)
+    if averaged:
+        GENE_AVERAGED.add(part)
+    else:
+        GENE_AVERAGED.discard(part)
+    return GENE_MAP[part]
+
+
+def genes_for(*parts):
+    """Sorted tuple of every gene index read by the given parts."""
+    indices = set()
+    pending = list(parts)
+    seen = set()
+
+    while pending:
+        part = pending.pop()
+        if part in seen:
+            continue
+        seen.add(part)
+        indices.update(GENE_MAP[part])
+        pending.extend(GENE_USES[part])
+
+    return tuple(sorted(indices))
+
+
+def gene_dependents(*parts):
+    """{gene index: set of the given parts that read it}, following GENE_USES."""
+    graph = {}
+    for part in parts:
+        for index in genes_for(part):
+            graph.setdefault(index, set()).add(part)
+    return graph
+
+
+def gene_key(genome, part):
+    """
+    Tuple of the gene values `part` reads from `genome`, including the
+    groups it uses: expressed values, or the allele sum for averaged
+    groups.  Equal keys mean the part renders identically.
+    """
+    if part in GENE_AVERAGED:
+        chromosome1, chromosome2 = genome.chromosome1, genome.chromosome2
+        key = tuple([chromosome1[i][1] + chromosome2[i][1] for i in GENE_MAP[part]])
+    else:
+        expressed = genome.expressed()
+        key = tuple([expressed[i] for i in GENE_MAP[part]])
+
+    for used in GENE_USES[part]:
+        key += gene_key(genome, used)
+    return key
+
+
+def gene_usage_report(num_genes, parts=None):
+    """
+    Summarises how the registered parts use a genome of `num_genes` genes.
+
+    Returns a dict:
+        used        : sorted indices read by at least one part
+        unused      : sorted indices in range(num_genes) nobody reads
+        overlapping : {index: [parts]} for indices declared by several parts
+        out_of_range: sorted declared indices >= num_genes
+    """
+    if parts is None:
+        parts = list(GENE_MAP)
+
+    owners = {}
+    for part in parts:
+        for index in GENE_MAP[part]:
+            owners.setdefault(index, []).append(part)
+
+    used = sorted(owners)
+    return {
+        'used': used,
+        'unused': [i for i in range(num_genes) if i not in owners],
+        'overlapping': {i: owners[i] for i in used if len(owners[i]) > 1},
+        'out_of_range': [i for i in used if i >= num_genes],
+    }
+
+
+# Skin color is derived here in genes.py (get_skin_color) and shared by
+# the head fill and the lip color.
+SKIN_GENES = register_genes("skin", [53, 54], averaged=True)
+
+
+# =====================================================
+# BINARY FORMAT
+# =====================================================
+# Genome.to_bytes() layout (little-endian):
+#
+#   header : magic b"TFGN", uint16 format version, uint16 num_genes
+#   body   : chromosome1 then chromosome2, each num_genes × (dominance, value)
+#
+# The body is exactly 2 × num_genes × 2 bytes; population files
+# (population.py) store many bodies back to back under one header.
+
+GENOME_MAGIC = b"TFGN"
+GENOME_FORMAT_VERSION = 1
+GENOME_HEADER = struct.Struct("<4sHH")
+
+
+# =====================================================
+# SEGMENT TYPE LOOKUP TABLES
+# =====================================================
+# A segment type is chosen deterministically from one gene byte and a
+# weight distribution.  Since a gene only has 256 possible values, the
+# whole choice is precomputed once per (segment_types, weights) pair.
+
+@functools.lru_cache(maxsize=None)
+def _segment_type_indices(weights):
+    # Convert weights to a cumulative distribution
+    total_weight = sum(weights)
+    cumulative = []
+    running = 0
+
+    for w in weights:
+        running += w
+        cumulative.append(running / total_weight)
+
+    indices = []
+    for gene_value in range(256):
+        # Scale gene value 0–255 -> 0–1
+        normalized = gene_value / 255.0
+
+        # First threshold the value falls under; fallback = last type
+        for i, threshold in enumerate(cumulative):
+            if normalized <= threshold:
+                break
+        else:
+            i = len(weights) - 1
+
+        indices.append(i)
+
+    return tuple(indices)
+
+
+def segment_type_indices(weights):
+    """
+    Returns a 256-entry tuple mapping a gene value to the index of the
+    selected segment type.  Suitable for numpy.take in batch code.
+    """
+    return _segment_type_indices(tuple(weights))
+
+
+@functools.lru_cache(maxsize=None)
+def _segment_type_table(segment_types, weights):
+    return tuple(segment_types[i] for i in _segment_type_indices(weights))
+
+
+def segment_type_table(segment_types, weights):
+    """
+    Returns a 256-entry tuple mapping a gene value straight to a
+    segment type.  Tables are cached per (segment_types, weights).
+    """
+    return _segment_type_table(tuple(segment_types), tuple(weights))
+
 
 # =====================================================
 # GENOME (TWO CHROMOSOMES)
@@ -7,31 +206,178 @@ import random
 class Genome:
     """
     Simple genome with two chromosomes.
-    Each chromosome is a list of tuples: (dominance, gene_value).
+    Each chromosome is a tuple of pairs: (dominance, gene_value).
     Dominance: higher value wins.
     Gene_value: 0–255
+
+    The expressed gene vector and the colors derived from it are computed
+    once and cached.  Chromosomes are immutable tuples, so the only ways to
+    change them (assigning chromosome1/chromosome2 or calling set_allele)
+    also drop the cache.
     """
 
-    def __init__(self, num_genes=128):
+    def __init__(self, num_genes=128, seed=None, genes=None):
         """
         Creates two chromosomes with random genes.
+
+        All alleles come from a single random-bytes draw of
+        2 chromosomes × num_genes × (dominance, gene_value) bytes.
+        seed=None uses the global `random` state; any other value makes
+        the genome reproducible on its own.
+
+        genes: optional iterable of gene indices (e.g. genes_for(...)).
+               Only those genes are drawn; every other allele is (0, 0).
         """
-        self.chromosome1 = [
-            (random.randint(0, 255), random.randint(0, 255))
-            for _ in range(num_genes)
-        ]
+        rng = random if seed is None else random.Random(seed)
+
+        if genes is None:
+            data = rng.randbytes(4 * num_genes)
+            half = 2 * num_genes
 
-        self.chromosome2 = [
-            (random.randint(0, 255), random.randint(0, 255))
-            for _ in range(num_genes)
-        ]
+            self.num_genes = num_genes
+            self.chromosome1 = zip(data[0:half:2], data[1:half:2])
+            self.chromosome2 = zip(data[half::2], data[half + 1::2])
+            return
+
+        genes = sorted(set(genes))
+        if genes and (genes[0] < 0 or genes[-1] >= num_genes):
+            raise IndexError("Gene index out of range")
+
+        data = rng.randbytes(4 * len(genes))
+        half = 2 * len(genes)
+
+        chromosome1 = [(0, 0)] * num_genes
+        chromosome2 = [(0, 0)] * num_genes
+        for n, index in enumerate(genes):
+            chromosome1[index] = (data[2 * n], data[2 * n + 1])
+            chromosome2[index] = (data[half + 2 * n], data[half + 2 * n + 1])
 
         self.num_genes = num_genes
+        self.chromosome1 = chromosome1
+        self.chromosome2 = chromosome2
+
+    @classmethod
+    def from_chromosomes(cls, chromosome1, chromosome2):
+        """
+        Builds a genome from existing chromosomes instead of random genes.
+        Both chromosomes must be sequences of (dominance, gene_value) pairs
+        of equal length.
+        """
+        if len(chromosome1) != len(chromosome2):
+            raise ValueError("Chromosomes must have the same number of genes")
+
+        genome = cls.__new__(cls)
+        genome.num_genes = len(chromosome1)
+        genome.chromosome1 = [(int(d), int(v)) for d, v in chromosome1]
+        genome.chromosome2 = [(int(d), int(v)) for d, v in chromosome2]
+        return genome
+
+    # =====================================================
+    # SERIALIZATION
+    # =====================================================
+
+    def body_bytes(self):
+        """Both chromosomes as 2 × num_genes × 2 raw bytes, no header."""
+        return (bytes(itertools.chain.from_iterable(self._chromosome1))
+                + bytes(itertools.chain.from_iterable(self._chromosome2)))
+
+    def to_bytes(self):
+        """Serialises the genome to the fixed-width binary format."""
+        header = GENOME_HEADER.pack(GENOME_MAGIC, GENOME_FORMAT_VERSION, self.num_genes)
+        return header + self.body_bytes()
+
+    @classmethod
+    def from_body_bytes(cls, body, num_genes):
+        """Inverse of body_bytes(); `body` may be any bytes-like object."""
+        body = bytes(body)
+        half = 2 * num_genes
+
+        if len(body) != 2 * half:
+            raise ValueError(f"Expected {2 * half} bytes for {num_genes} genes, got {len(body)}")
+
+        genome = cls.__new__(cls)
+        genome.num_genes = num_genes
+        genome.chromosome1 = zip(body[0:half:2], body[1:half:2])
+        genome.chromosome2 = zip(body[half::2], body[half + 1::2])
+        return genome
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Inverse of to_bytes()."""
+        if len(data) < GENOME_HEADER.size:
+            raise ValueError("Data too short for a genome header")
+
+        magic, version, num_genes = GENOME_HEADER.unpack_from(data)
+        if magic != GENOME_MAGIC:
+            raise ValueError("Not a serialised genome (bad magic)")
+        if version != GENOME_FORMAT_VERSION:
+            raise ValueError(f"Unsupported genome format version {version}")
+
+        return cls.from_body_bytes(memoryview(data)[GENOME_HEADER.size:], num_genes)
+
+    # =====================================================
+    # CHROMOSOMES
+    # =====================================================
+
+    @property
+    def chromosome1(self):
+        return self._chromosome1
+
+    @chromosome1.setter
+    def chromosome1(self, pairs):
+        self._chromosome1 = tuple(pairs)
+        self._invalidate()
+
+    @property
+    def chromosome2(self):
+        return self._chromosome2
+
+    @chromosome2.setter
+    def chromosome2(self, pairs):
+        self._chromosome2 = tuple(pairs)
+        self._invalidate()
+
+    def set_allele(self, chromosome, index, dominance, value):
+        """
+        Replaces one allele.
+        chromosome: 1 or 2
+        """
+        if index < 0 or index >= self.num_genes:
+            raise IndexError("Gene index out of range")
+
+        if chromosome == 1:
+            pairs = list(self._chromosome1)
+            pairs[index] = (dominance, value)
+            self.chromosome1 = pairs
+        elif chromosome == 2:
+            pairs = list(self._chromosome2)
+            pairs[index] = (dominance, value)
+            self.chromosome2 = pairs
+        else:
+            raise ValueError("chromosome must be 1 or 2")
+
+    def _invalidate(self):
+        """Drops every cached value derived from the chromosomes."""
+        self._expressed = None
+        self._derived = {}
 
     # =====================================================
     # BASIC GETTER
     # =====================================================
 
+    def expressed(self):
+        """
+        Returns the expressed gene vector: for every index, the value of the
+        allele with the higher dominance (chromosome1 wins ties).
+        Computed once per chromosome state.
+        """
+        if self._expressed is None:
+            self._expressed = tuple([
+                val1 if dom1 >= dom2 else val2
+                for (dom1, val1), (dom2, val2) in zip(self._chromosome1, self._chromosome2)
+            ])
+        return self._expressed
+
     def get_gene(self, index):
         """
         Returns the gene value at `index`.
@@ -40,10 +386,11 @@ class Genome:
         if index < 0 or index >= self.num_genes:
             raise IndexError("Gene index out of range")
 
-        dom1, val1 = self.chromosome1[index]
-        dom2, val2 = self.chromosome2[index]
+        expressed = self._expressed
+        if expressed is None:
+            expressed = self.expressed()
 
-        return val1 if dom1 >= dom2 else val2
+        return expressed[index]
 
     def get_gene_avg(self, index):
         """
@@ -53,8 +400,8 @@ class Genome:
         if index < 0 or index >= self.num_genes:
             raise IndexError("Gene index out of range")
 
-        dom1, val1 = self.chromosome1[index]
-        dom2, val2 = self.chromosome2[index]
+        dom1, val1 = self._chromosome1[index]
+        dom2, val2 = self._chromosome2[index]
 
         return (val1 + val2) / 2
 
@@ -103,32 +450,20 @@ class Genome:
         weights       : list of weights in the same order
         upper         : True = upper eyelid, False = lower eyelid
         """
+        table = segment_type_table(segment_types, weights)
+        return self.lookup_segment_type(segment, table, upper)
+
+    def lookup_segment_type(self, segment, table, upper=True):
+        """
+        Same as get_segment_type, but with a prebuilt 256-entry table
+        from segment_type_table() — a single index, no per-call setup.
+        """
 
         # Gene indices:
         # 24–27 = upper segment types
         # 28–31 = lower segment types
         base_idx = 24 if upper else 28
-        gene_value = self.get_gene(base_idx + segment)
-
-        # Convert weights to a cumulative distribution
-        total_weight = sum(weights)
-        cumulative = []
-        running = 0
-
-        for w in weights:
-            running += w
-            cumulative.append(running / total_weight)
-
-        # Scale gene value 0–255 -> 0–1
-        normalized = gene_value / 255.0
-
-        # Deterministically select type
-        for i, threshold in enumerate(cumulative):
-            if normalized <= threshold:
-                return segment_types[i]
-
-        # fallback
-        return segment_types[-1]
+        return table[self.get_gene(base_idx + segment)]
 
     # -----------------------------------------------------
     # TENSION GENES
@@ -153,22 +488,30 @@ class Genome:
         Returns the iris color as an RGB triple.
         Each channel is the average of four genes.
         """
-        r = (self.get_gene(40) + self.get_gene(41)  + self.get_gene(42) + self.get_gene(43)) // 4
-        g = (self.get_gene(44) + self.get_gene(45)  + self.get_gene(46) + self.get_gene(47)) // 4
-        b = (self.get_gene(48) + self.get_gene(49)  + self.get_gene(50) + self.get_gene(51)) // 4
+        color = self._derived.get('iris')
+        if color is None:
+            e = self.expressed()
+            r = (e[40] + e[41] + e[42] + e[43]) // 4
+            g = (e[44] + e[45] + e[46] + e[47]) // 4
+            b = (e[48] + e[49] + e[50] + e[51]) // 4
+            color = self._derived['iris'] = (r, g, b)
 
-        return (r, g, b)
+        return color
 
     def get_iris_highlight_color(self):
         """
         Returns the iris highlight color as an RGB triple.
         Each channel is the average of three genes.
         """
-        r = (self.get_gene(40) + self.get_gene(41)  + self.get_gene(42)) // 3
-        g = (self.get_gene(44) + self.get_gene(45)  + self.get_gene(46)) // 3
-        b = (self.get_gene(48) + self.get_gene(49)  + self.get_gene(50)) // 3
+        color = self._derived.get('iris_highlight')
+        if color is None:
+            e = self.expressed()
+            r = (e[40] + e[41] + e[42]) // 3
+            g = (e[44] + e[45] + e[46]) // 3
+            b = (e[48] + e[49] + e[50]) // 3
+            color = self._derived['iris_highlight'] = (r, g, b)
 
-        return (r, g, b)
+        return color
 
     def get_iris_highlight_multiplier(self):
         return self.get_gene(52) / 255.0
@@ -211,23 +554,20 @@ class Genome:
         return (self.get_gene(108) / 255.0) * 0.15 - 0.10
 
     # -----------------------------------------------------
-    # SKIN COLOR
+    # SKIN COLOR  (genes 53–54, registered as "skin")
     # -----------------------------------------------------
 
     def get_skin_color(self):
         """
         Returns an RGB triple interpolated smoothly across SKIN_PALETTE.
         """
-        SKIN_PALETTE = [
-        (117, 58, 15),   # darkest brown
-        (145, 75, 50),   # dark brown
-        (182, 107, 62),  # medium brown
-        (195, 124, 77),  # light brown
-        (210, 153, 108), # very light brown
-        (245, 204, 171), # near fair
-        (249, 213, 202)  # pinkish fair
-        ]
+        color = self._derived.get('skin')
+        if color is None:
+            color = self._derived['skin'] = self._compute_skin_color()
+
+        return color
 
+    def _compute_skin_color(self):
         gene_value = 1 - (self.get_gene_avg(53) / 255) * (self.get_gene_avg(54) / 255)
         t = gene_value  * (len(SKIN_PALETTE) - 1)
 
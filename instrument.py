@@ -0,0 +1,108 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+# =====================================================
+# PIPELINE INSTRUMENTATION
+# =====================================================
+#
+# Opt-in per-stage counters for the face pipeline.  Functions and part
+# methods are tagged with @instrumented("stage"); while a recording()
+# block is active every call adds
+#
+#   calls, wall time (inclusive of nested stages), output bytes
+#
+# to the stage's row in the active StageRecorder.  Outside recording()
+# a tagged call costs one global lookup.  The recorder is process-wide,
+# so calls from every thread are counted.
+#
+#   with recording() as recorder:
+#       for seed in range(1000):
+#           generate_face_svg(seed=seed)
+#   print(recorder.format_table())
+
+_RECORDER = None
+
+
+class StageRecorder:
+
+    def __init__(self):
+        self.stages = {}      # stage -> [calls, seconds, bytes]
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, nbytes=0):
+        with self._lock:
+            row = self.stages.get(stage)
+            if row is None:
+                row = self.stages[stage] = [0, 0.0, 0]
+            row[0] += 1
+            row[1] += seconds
+            row[2] += nbytes
+
+    def clear(self):
+        with self._lock:
+            self.stages.clear()
+
+    def rows(self):
+        """One dict per stage, slowest total first."""
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: -item[1][1])
+        return [
+            dict(stage=stage, calls=calls, seconds=seconds,
+                 mean_us=seconds / calls * 1e6, bytes=nbytes, mean_bytes=nbytes / calls)
+            for stage, (calls, seconds, nbytes) in stages
+        ]
+
+    def to_json(self, indent=None):
+        return json.dumps(self.rows(), indent=indent)
+
+    def format_table(self):
+        """rows() as a plain-text table."""
+        lines = ["stage                          calls    total ms   mean us  mean bytes"]
+        for row in self.rows():
+            lines.append(f"{row['stage']:<30} {row['calls']:>5} {row['seconds'] * 1e3:>11.2f} "
+                         f"{row['mean_us']:>9.1f} {row['mean_bytes']:>11.0f}")
+        return "\n".join(lines)
+
+
+def instrumented(stage):
+    """Decorator recording each call as `stage` while recording() is active."""
+
+    def decorate(func):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _RECORDER
+            if recorder is None:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            seconds = time.perf_counter() - start
+            recorder.add(stage, seconds, len(result) if isinstance(result, (str, bytes)) else 0)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def recording(recorder=None):
+    """
+    Records tagged calls into `recorder` (a new StageRecorder by default)
+    for the duration of the block.  Pass the same recorder again to keep
+    aggregating across blocks.
+    """
+    global _RECORDER
+    if recorder is None:
+        recorder = StageRecorder()
+
+    previous, _RECORDER = _RECORDER, recorder
+    try:
+        yield recorder
+    finally:
+        _RECORDER = previous
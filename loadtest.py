@@ -0,0 +1,87 @@
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+
+# =====================================================
+# HTTP LOAD TEST
+# =====================================================
+#
+# Drives a running ui.py server with `clients` concurrent threads, each
+# issuing requests back to back for `duration` seconds, and reports
+# throughput and latency:
+#
+#   python ui.py --no-browser &
+#   python loadtest.py --clients 50 --path /face
+
+DEFAULT_URL = "http://localhost:8765"
+DEFAULT_CLIENTS = 50
+DEFAULT_DURATION = 10.0
+
+
+def load_test(url=DEFAULT_URL, path="/face", clients=DEFAULT_CLIENTS, duration=DEFAULT_DURATION,
+              timeout=30.0):
+    """
+    Returns a dict: requests, errors (non-200 or failed), requests_per_sec,
+    and p50_ms / p90_ms / p99_ms / max_ms over the successful requests.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        done, failed = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url + path, timeout=timeout) as response:
+                    response.read()
+                done.append(time.perf_counter() - start)
+            except (urllib.error.URLError, OSError):
+                failed += 1
+        with lock:
+            latencies.extend(done)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1e3 if latencies else np.zeros(1)
+    return dict(
+        clients=clients, path=path, requests=len(latencies), errors=errors[0],
+        requests_per_sec=len(latencies) / elapsed,
+        p50_ms=float(np.percentile(ms, 50)), p90_ms=float(np.percentile(ms, 90)),
+        p99_ms=float(np.percentile(ms, 99)), max_ms=float(ms.max()),
+    )
+
+
+def format_load_test(result):
+    """load_test() result as one line."""
+    return (f"{result['path']:<12} {result['clients']:>3} clients  "
+            f"{result['requests_per_sec']:>7.1f} req/s  "
+            f"p50 {result['p50_ms']:>7.1f} ms  p90 {result['p90_ms']:>7.1f} ms  "
+            f"p99 {result['p99_ms']:>7.1f} ms  errors {result['errors']}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Concurrent load test for ui.py")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--path", action="append",
+                        help="request path, repeatable (default: /face and /generate)")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS)
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds per path")
+    args = parser.parse_args()
+
+    for path in args.path or ["/face", "/generate"]:
+        print(format_load_test(load_test(args.url, path, args.clients, args.duration)))
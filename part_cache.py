@@ -0,0 +1,99 @@
+import functools
+import threading
+from contextlib import contextmanager
+
+from face_cache import FaceCache
+from genes import gene_key
+
+
+# =====================================================
+# PER-PART OUTPUT CACHE
+# =====================================================
+#
+# Each part's generate_group() output depends only on
+#
+#   - the genes registered for the part (genes.GENE_MAP), plus the groups
+#     it uses — exactly what genes.gene_key() returns
+#   - the part's other constructor settings, named in the decorator
+#     (e.g. the eye stroke_ratio)
+#   - the call arguments
+#
+# @cached_group(part) memoises generate_group() on that tuple, so a child
+# face that shares a parent's eye genes reuses the parent's eye markup and
+# only the parts whose genes changed are rebuilt.  One FaceCache per part.
+#
+# Caching is opt-in: unrelated random faces almost never share a part, and
+# there the key and cache bookkeeping only add time.  part_caching()
+# turns it on for one thread where faces do share genes: the editor's
+# render_face() / update_face() use it, and generate_faces(cache_parts=True)
+# renders bred siblings with it.
+
+PART_CACHE_ENTRIES = 2048
+# Entries kept per part; part markup is small (a few KB at most).
+
+PART_CACHES = {}
+PART_CACHE_ENABLED = False
+# Process-wide default; part_caching() overrides it for one thread.
+
+_LOCAL = threading.local()
+
+
+def _caching():
+    return getattr(_LOCAL, "enabled", PART_CACHE_ENABLED)
+
+
+def cached_group(part, settings=()):
+    """
+    Decorator memoising a part's generate_group() by gene_key(genome, part),
+    the instance attributes named in `settings` and the call arguments.
+    """
+
+    cache = PART_CACHES.setdefault(part, FaceCache(max_entries=PART_CACHE_ENTRIES))
+
+    def decorate(generate_group):
+
+        @functools.wraps(generate_group)
+        def wrapper(self, *args, **kwargs):
+            if not _caching():
+                return generate_group(self, *args, **kwargs)
+
+            key = (gene_key(self.genome, part), tuple([getattr(self, name) for name in settings]),
+                   args, tuple(sorted(kwargs.items())))
+            return cache.get_or_render(key, lambda: generate_group(self, *args, **kwargs))
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def part_caching(enabled=True):
+    """Turns part caching on (or off) for the calling thread inside the block."""
+    previous = getattr(_LOCAL, "enabled", None)
+    _LOCAL.enabled = enabled
+    try:
+        yield
+    finally:
+        if previous is None:
+            del _LOCAL.enabled
+        else:
+            _LOCAL.enabled = previous
+
+
+def set_part_cache_enabled(enabled):
+    """
+    Sets the process-wide default (existing entries are kept); threads
+    inside part_caching() keep their own setting.
+    """
+    global PART_CACHE_ENABLED
+    PART_CACHE_ENABLED = enabled
+
+
+def clear_part_caches():
+    for cache in PART_CACHES.values():
+        cache.clear()
+
+
+def part_cache_stats():
+    """{part: FaceCache.stats()} for every cached part."""
+    return {part: cache.stats() for part, cache in PART_CACHES.items()}
@@ -0,0 +1,245 @@
+from functools import lru_cache
+from itertools import repeat
+from operator import mul, sub
+
+from compact import MAX_PRECISION, step_text
+
+
+# =====================================================
+# NUMERIC PATH REPRESENTATION
+# =====================================================
+#
+# Part modules build their outlines as Path objects instead of formatting
+# `d` strings segment by segment.  A Path is two flat lists:
+#
+#   commands : one code per command — "M", "L", "C", "Q" or "Z"
+#   coords   : the command arguments, in order (2, 2, 6, 4 or 0 floats)
+#
+# Reversing, concatenating and dropping the leading move are list
+# operations on those numbers, so nothing is formatted until the finished
+# path is serialised — once — by to_svg().  to_svg(compact=True) writes
+# relative commands with minimal numbers instead (see compact.py).
+
+ARG_COUNTS = {"M": 2, "L": 2, "C": 6, "Q": 4, "Z": 0}
+# Floats consumed by each command code.
+
+DEFAULT_PRECISION = 4
+# Decimal places written by to_svg() unless the path says otherwise.
+
+
+@lru_cache(maxsize=1024)
+def _relative_reference(commands):
+    """
+    For a command sequence, the index into coords of the current-point
+    coordinate each coordinate is relative to in compact output, or -1
+    for the absolute leading move.
+    """
+    reference = []
+    x = y = start_x = start_y = -1
+    for code in commands:
+        n = ARG_COUNTS[code]
+        if code == "Z":
+            x, y = start_x, start_y
+            continue
+        first = len(reference)
+        reference += [x, y] * (n // 2)
+        if code == "M":
+            start_x, start_y = first, first + 1
+        x, y = first + n - 2, first + n - 1
+    return tuple(reference)
+
+
+@lru_cache(maxsize=1024)
+def _template(commands, precision):
+    """
+    str.format template serialising a command sequence in one call,
+    e.g. "MC" → "M {:.2f} {:.2f} C {:.2f} ... {:.2f}".
+    """
+    number = f"{{:.{precision}f}}"
+    return " ".join(
+        " ".join([code] + [number] * ARG_COUNTS[code])
+        for code in commands
+    )
+
+
+@lru_cache(maxsize=1024)
+def _line_coords(commands):
+    """Index into coords of the x coordinate of every L command."""
+    indices = []
+    i = 0
+    for code in commands:
+        if code == "L":
+            indices.append(i)
+        i += ARG_COUNTS[code]
+    return tuple(indices)
+
+
+@lru_cache(maxsize=4096)
+def _compact_template(commands, axes):
+    """
+    str.format template of a command sequence in compact output, and the
+    indices of the coordinates it leaves out.  axes holds, per L command,
+    "h" or "v" for a line along an axis (written h dx / v dy), else "".
+    """
+    template = []
+    dropped = []
+    last = None
+    lines = iter(axes)
+    i = 0
+
+    for code in commands:
+        n = ARG_COUNTS[code]
+        letter = code if last is None else code.lower()
+
+        if code == "L":
+            axis = next(lines)
+            if axis:
+                letter = axis
+                dropped.append(i if axis == "v" else i + 1)
+                n = 1
+
+        # A repeated command letter may be omitted (not after a move)
+        prefix = " " if letter == last and letter not in "Mmz" else letter
+        template.append(prefix + " ".join(["{}"] * n))
+        last = letter
+        i += ARG_COUNTS[code]
+
+    return "".join(template), tuple(dropped)
+
+
+class Path:
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        """
+        precision: decimal places to_svg() writes by default.
+        """
+        self.commands = []
+        self.coords = []
+        self.precision = precision
+
+    # =====================================================
+    # BUILDING
+    # =====================================================
+
+    def move_to(self, x, y):
+        self.commands.append("M")
+        self.coords += (x, y)
+        return self
+
+    def line_to(self, x, y):
+        self.commands.append("L")
+        self.coords += (x, y)
+        return self
+
+    def curve_to(self, c1x, c1y, c2x, c2y, x, y):
+        """Cubic Bezier from the current point to (x, y)."""
+        self.commands.append("C")
+        self.coords += (c1x, c1y, c2x, c2y, x, y)
+        return self
+
+    def quad_to(self, cx, cy, x, y):
+        """Quadratic Bezier from the current point to (x, y)."""
+        self.commands.append("Q")
+        self.coords += (cx, cy, x, y)
+        return self
+
+    def close(self):
+        self.commands.append("Z")
+        return self
+
+    def _copy(self, commands, coords):
+        path = Path(self.precision)
+        path.commands = commands
+        path.coords = coords
+        return path
+
+    # =====================================================
+    # STRUCTURAL OPERATIONS
+    # =====================================================
+
+    def __add__(self, other):
+        """Concatenation: other's commands follow this path's."""
+        return self._copy(self.commands + other.commands, self.coords + other.coords)
+
+    def strip_move(self):
+        """
+        Copy without the leading M, so the path continues from wherever
+        the path it is appended to ends.
+        """
+        if self.commands[:1] != ["M"]:
+            return self._copy(list(self.commands), list(self.coords))
+        return self._copy(self.commands[1:], self.coords[2:])
+
+    def reversed(self):
+        """
+        The same open subpath traversed end → start: starts with an M at
+        the old end point, and every curve runs backwards (cubic control
+        points swapped, quadratic control point unchanged).
+        """
+        segments = []
+        x = y = 0.0
+        i = 0
+        for code in self.commands:
+            n = ARG_COUNTS[code]
+            args = self.coords[i:i + n]
+            i += n
+            if code == "Z":
+                raise ValueError("Only open paths can be reversed")
+            if code != "M":
+                segments.append((code, args, x, y))
+            x, y = args[-2], args[-1]
+
+        commands = ["M"]
+        coords = [x, y]
+        for code, args, x0, y0 in reversed(segments):
+            commands.append(code)
+            if code == "C":
+                coords += (args[2], args[3], args[0], args[1], x0, y0)
+            elif code == "Q":
+                coords += (args[0], args[1], x0, y0)
+            else:
+                coords += (x0, y0)
+        return self._copy(commands, coords)
+
+    # =====================================================
+    # SERIALISATION
+    # =====================================================
+
+    def to_svg(self, precision=None, compact=False):
+        """
+        The path as an SVG `d` attribute value.
+
+        compact=True writes relative commands (h/v for axis-aligned
+        lines), drops repeated command letters and redundant zeros;
+        precision is then capped at compact.MAX_PRECISION.  Absolute coordinates are rounded
+        before differencing, so rounding errors do not accumulate.
+        """
+        if precision is None:
+            precision = self.precision
+        if compact:
+            return self._compact_svg(precision)
+        return _template("".join(self.commands), precision).format(*self.coords)
+
+    __str__ = to_svg
+
+    def _compact_svg(self, precision):
+        precision = min(precision, MAX_PRECISION)
+        commands = "".join(self.commands)
+        reference = _relative_reference(commands)
+
+        # Quantise absolute coordinates, then difference the integers;
+        # the absolute leading move is relative to the 0 appended last.
+        # round() halves to even like np.rint.  map() keeps the per-number
+        # work out of the interpreter loop.
+        quantised = list(map(round, map(mul, self.coords, repeat(10 ** precision))))
+        quantised.append(0)
+        steps = list(map(sub, quantised, map(quantised.__getitem__, reference)))
+
+        axes = tuple("v" if steps[i] == 0 else "h" if steps[i + 1] == 0 else ""
+                     for i in _line_coords(commands))
+        template, dropped = _compact_template(commands, axes)
+        for i in reversed(dropped):
+            del steps[i]
+
+        # Each number in its shortest form; no space before a minus sign
+        return template.format(*map(step_text(precision), steps)).replace(" -", "-")
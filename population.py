@@ -0,0 +1,325 @@
+import os
+import struct
+
+import numpy as np
+
+from genes import Genome, SKIN_PALETTE, genes_for
+
+
+# =====================================================
+# ARRAY LAYOUT
+# =====================================================
+#
+# A population of N genomes is one contiguous uint8 array:
+#
+#   alleles[n, gene, chromosome, field]
+#
+#   n          : genome index        0 … N-1
+#   gene       : gene index          0 … num_genes-1
+#   chromosome : 0 = chromosome1, 1 = chromosome2
+#   field      : 0 = dominance, 1 = gene value
+#
+# Every Genome getter has a vectorised counterpart below that resolves
+# the whole population in one pass instead of one gene at a time.
+
+DOMINANCE = 0
+VALUE = 1
+
+_SKIN_PALETTE = np.array(SKIN_PALETTE, dtype=np.float64)
+
+
+# =====================================================
+# POPULATION FILE FORMAT
+# =====================================================
+#
+#   header  : magic b"TFGP", uint16 format version, uint16 num_genes,
+#             uint64 genome count                        (16 bytes)
+#   records : count × Genome.body_bytes()  (2 × num_genes × 2 bytes each)
+#
+# Records are fixed width and stored chromosome-major exactly as in
+# Genome.to_bytes(), so a file can be memory-mapped and indexed directly.
+
+POPULATION_MAGIC = b"TFGP"
+POPULATION_FORMAT_VERSION = 1
+POPULATION_HEADER = struct.Struct("<4sHHQ")
+
+
+# =====================================================
+# GENOME POPULATION
+# =====================================================
+
+class GenomePopulation:
+    """
+    N genomes held as a single (N, num_genes, 2, 2) uint8 array.
+    """
+
+    def __init__(self, alleles):
+        alleles = np.asarray(alleles)
+
+        if alleles.ndim != 4 or alleles.shape[2:] != (2, 2):
+            raise ValueError("alleles must have shape (N, num_genes, 2, 2)")
+        if alleles.dtype != np.uint8:
+            alleles = alleles.astype(np.uint8)
+
+        self.alleles = alleles
+
+    @classmethod
+    def random(cls, size, num_genes=128, seed=None, genes=None):
+        """
+        Creates `size` random genomes from a single bulk draw.
+        seed: anything accepted by numpy.random.default_rng.
+        genes: optional gene indices to draw; all other alleles are 0.
+        """
+        rng = np.random.default_rng(seed)
+
+        if genes is None:
+            alleles = rng.integers(0, 256, size=(size, num_genes, 2, 2), dtype=np.uint8)
+        else:
+            genes = list(genes)
+            alleles = np.zeros((size, num_genes, 2, 2), dtype=np.uint8)
+            alleles[:, genes] = rng.integers(0, 256, size=(size, len(genes), 2, 2),
+                                             dtype=np.uint8)
+
+        return cls(alleles)
+
+    @classmethod
+    def from_genomes(cls, genomes):
+        """
+        Packs a sequence of Genome objects (all with the same num_genes)
+        into one population array.
+        """
+        genomes = list(genomes)
+        if not genomes:
+            raise ValueError("Cannot build a population from zero genomes")
+
+        num_genes = genomes[0].num_genes
+        alleles = np.empty((len(genomes), num_genes, 2, 2), dtype=np.uint8)
+
+        for n, genome in enumerate(genomes):
+            if genome.num_genes != num_genes:
+                raise ValueError("All genomes must have the same number of genes")
+            alleles[n, :, 0] = genome.chromosome1
+            alleles[n, :, 1] = genome.chromosome2
+
+        return cls(alleles)
+
+    def record_bytes(self):
+        """
+        All genomes as consecutive Genome.body_bytes() records
+        (i.e. converted to chromosome-major order).
+        """
+        return np.ascontiguousarray(self.alleles.transpose(0, 2, 1, 3)).tobytes()
+
+    # =====================================================
+    # CONTAINER PROTOCOL
+    # =====================================================
+
+    @property
+    def size(self):
+        return self.alleles.shape[0]
+
+    @property
+    def num_genes(self):
+        return self.alleles.shape[1]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        """
+        population[i]     → Genome (plain Python object, usable by every part)
+        population[a:b]   → GenomePopulation view (no copy)
+        """
+        if isinstance(index, slice):
+            return GenomePopulation(self.alleles[index])
+        return self.genome(index)
+
+    def __iter__(self):
+        for n in range(self.size):
+            yield self.genome(n)
+
+    def genome(self, n):
+        """Returns genome `n` as a Genome object."""
+        pair = self.alleles[n]
+        return Genome.from_chromosomes(pair[:, 0].tolist(), pair[:, 1].tolist())
+
+    # =====================================================
+    # GENE EXPRESSION
+    # =====================================================
+
+    def express(self, genes=None):
+        """
+        Vectorised Genome.get_gene for every gene of every genome.
+        Returns an (N, num_genes) uint8 matrix of expressed gene values.
+
+        genes: optional sequence of gene indices (e.g. genes_for("mouth"));
+               only those columns are expressed, in that order.
+        """
+        alleles = self.alleles if genes is None else self.alleles[:, list(genes)]
+
+        dom1 = alleles[:, :, 0, DOMINANCE]
+        dom2 = alleles[:, :, 1, DOMINANCE]
+        val1 = alleles[:, :, 0, VALUE]
+        val2 = alleles[:, :, 1, VALUE]
+
+        return np.where(dom1 >= dom2, val1, val2)
+
+    def express_avg(self, genes=None):
+        """
+        Vectorised Genome.get_gene_avg.
+        Returns an (N, num_genes) float64 matrix; `genes` as in express().
+        """
+        alleles = self.alleles if genes is None else self.alleles[:, list(genes)]
+
+        values = alleles[:, :, :, VALUE].astype(np.float64)
+        return (values[:, :, 0] + values[:, :, 1]) / 2
+
+    def express_part(self, part):
+        """
+        Expressed columns for one registered part, e.g. express_part("nose").
+        Returns (indices, matrix): matrix[:, k] holds gene indices[k].
+        """
+        indices = genes_for(part)
+        return indices, self.express(indices)
+
+    def get_segment_types(self, index_table, upper=True, expressed=None):
+        """
+        Vectorised Genome.lookup_segment_type for all four segments.
+
+        index_table: 256-entry table from genes.segment_type_indices().
+        Returns an (N, 4) array of indices into the segment type list.
+        """
+        if expressed is None:
+            expressed = self.express()
+
+        base_idx = 24 if upper else 28
+        return np.take(np.asarray(index_table), expressed[:, base_idx:base_idx + 4])
+
+    # =====================================================
+    # COLORS
+    # =====================================================
+
+    def get_skin_colors(self):
+        """
+        Vectorised Genome.get_skin_color.
+        Returns an (N, 3) int array of RGB triples.
+        """
+        values = self.alleles[:, 53:55, :, VALUE].astype(np.float64)
+        avg = (values[:, :, 0] + values[:, :, 1]) / 2
+
+        gene_value = 1 - (avg[:, 0] / 255) * (avg[:, 1] / 255)
+        t = gene_value * (len(SKIN_PALETTE) - 1)
+
+        idx0 = t.astype(np.int64)
+        idx1 = np.minimum(idx0 + 1, len(SKIN_PALETTE) - 1)
+        f = (t - idx0)[:, None]
+
+        c0 = _SKIN_PALETTE[idx0]
+        c1 = _SKIN_PALETTE[idx1]
+
+        return (c0 + (c1 - c0) * f).astype(np.int64)
+
+    def _channel_means(self, expressed, genes_per_channel):
+        """
+        Integer mean of the first `genes_per_channel` genes in each of the
+        three 4-gene iris channel blocks (40–43, 44–47, 48–51).
+        """
+        blocks = expressed[:, 40:52].astype(np.int64).reshape(-1, 3, 4)
+        return blocks[:, :, :genes_per_channel].sum(axis=2) // genes_per_channel
+
+    def get_iris_colors(self, expressed=None):
+        """
+        Vectorised Genome.get_iris_color.
+        Returns an (N, 3) int array of RGB triples.
+        """
+        if expressed is None:
+            expressed = self.express()
+        return self._channel_means(expressed, 4)
+
+    def get_iris_highlight_colors(self, expressed=None):
+        """
+        Vectorised Genome.get_iris_highlight_color.
+        Returns an (N, 3) int array of RGB triples.
+        """
+        if expressed is None:
+            expressed = self.express()
+        return self._channel_means(expressed, 3)
+
+
+# =====================================================
+# POPULATION FILES
+# =====================================================
+
+def _read_population_header(f):
+    data = f.read(POPULATION_HEADER.size)
+    if len(data) < POPULATION_HEADER.size:
+        raise ValueError("File too short for a population header")
+
+    magic, version, num_genes, count = POPULATION_HEADER.unpack(data)
+    if magic != POPULATION_MAGIC:
+        raise ValueError("Not a population file (bad magic)")
+    if version != POPULATION_FORMAT_VERSION:
+        raise ValueError(f"Unsupported population format version {version}")
+
+    return num_genes, count
+
+
+def save_population(path, population, chunk_size=65536):
+    """
+    Writes `population` to a new population file at `path`,
+    `chunk_size` genomes at a time.
+    """
+    with open(path, "wb") as f:
+        f.write(POPULATION_HEADER.pack(POPULATION_MAGIC, POPULATION_FORMAT_VERSION,
+                                       population.num_genes, population.size))
+        for start in range(0, population.size, chunk_size):
+            f.write(population[start:start + chunk_size].record_bytes())
+
+
+def append_population(path, population):
+    """
+    Appends genomes to the population file at `path`, creating it if needed.
+    Accepts a GenomePopulation or a sequence of Genome objects.
+    """
+    if not isinstance(population, GenomePopulation):
+        population = GenomePopulation.from_genomes(population)
+
+    if not os.path.exists(path):
+        save_population(path, population)
+        return
+
+    with open(path, "r+b") as f:
+        num_genes, count = _read_population_header(f)
+        if num_genes != population.num_genes:
+            raise ValueError("Genomes do not match the file's gene count")
+
+        f.seek(POPULATION_HEADER.size + count * 4 * num_genes)
+        f.write(population.record_bytes())
+        f.truncate()
+
+        # Header is updated last so an interrupted append leaves the old count
+        f.seek(0)
+        f.write(POPULATION_HEADER.pack(POPULATION_MAGIC, POPULATION_FORMAT_VERSION,
+                                       num_genes, count + population.size))
+
+
+def open_population(path, mode="r"):
+    """
+    Memory-maps a population file and returns it as a GenomePopulation
+    without reading the records into memory.
+
+    mode: numpy.memmap mode — "r" (read-only), "r+" (writes go to the file),
+          "c" (copy-on-write).
+    """
+    with open(path, "rb") as f:
+        num_genes, count = _read_population_header(f)
+
+    if count == 0:
+        return GenomePopulation(np.empty((0, num_genes, 2, 2), dtype=np.uint8))
+
+    records = np.memmap(path, dtype=np.uint8, mode=mode,
+                        offset=POPULATION_HEADER.size,
+                        shape=(count, 2, num_genes, 2))
+
+    # File is chromosome-major; the transposed view costs nothing.
+    return GenomePopulation(records.transpose(0, 2, 1, 3))
@@ -0,0 +1,844 @@
+import re
+import struct
+import xml.etree.ElementTree as ET
+import zlib
+
+import numpy as np
+
+from paths import Path
+
+
+# =====================================================
+# RASTERIZER
+# =====================================================
+#
+# Scan-converts face geometry into an RGBA array, without any external
+# renderer.  Thumbnails take the part classes' geometry directly (see
+# PART GEOMETRY below); saved documents go through rasterize_svg(), which
+# reads the SVG subset the part classes produce:
+#
+#   <path>     M/L/H/V/C/Q/Z (absolute or relative), filled and/or stroked
+#   <circle>   filled
+#   <polygon>  filled (iris highlight)
+#   <g>, <use> with translate/scale transforms
+#   clip-path  referencing a <clipPath> of paths, on shapes or groups
+#   <style>    class selectors only (the compact output mode)
+#
+# Fill and stroke properties are inherited from enclosing groups.  Groups
+# with style="display:none" (the ctrl-points overlays) are skipped.
+#
+# Every shape is flattened to polygons in pixel space and filled with a
+# nonzero-winding scanline over DEFAULT_SUPERSAMPLE sample rows per pixel:
+# edge crossings of all sample rows are computed at once, their signed
+# area contributions accumulated into a per-row difference array with one
+# bincount, and integrated along x.  Sample rows are averaged down to
+# per-pixel coverage and composited with "source over".  All work is
+# confined to the shape's bounding box.
+
+DEFAULT_SUPERSAMPLE = 4
+# Sample rows per pixel.  Horizontal coverage is computed exactly from
+# the crossing positions, so only the vertical axis is supersampled.
+
+CURVE_STEPS = 8
+# Line segments per Bezier curve when flattening.
+
+CIRCLE_STEPS = 32
+# Polygon vertices per circle.
+
+ROUND_JOIN_MIN_WIDTH = 1.0
+# Strokes at most this many pixels wide get butt ends: their round caps
+# and joins would add less than a pixel's coverage but most of the edges.
+
+NAMED_COLORS = {
+    "black": (0, 0, 0),
+    "white": (255, 255, 255),
+    "red":   (255, 0, 0),
+    "blue":  (0, 0, 255),
+}
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_PATH_TOKEN = re.compile(r"[MLHVCQZmlhvcqz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_TRANSFORM = re.compile(r"(\w+)\s*\(([^)]*)\)")
+_URL_REF = re.compile(r"url\(#([^)]+)\)")
+_CLASS_RULE = re.compile(r"\.([\w-]+)\s*\{([^}]*)\}")
+
+INHERITED = ("fill", "stroke", "stroke-width", "stroke-linecap", "stroke-linejoin")
+# Presentation properties passed from groups to their children.
+
+# Bernstein bases for flattening, rows = t in (0, 1]
+_T = np.linspace(0.0, 1.0, CURVE_STEPS + 1)[1:, None]
+_CUBIC_BASIS = np.hstack([(1 - _T) ** 3, 3 * (1 - _T) ** 2 * _T, 3 * (1 - _T) * _T ** 2, _T ** 3])
+_QUAD_BASIS = np.hstack([(1 - _T) ** 2, 2 * (1 - _T) * _T, _T ** 2])
+
+_ANGLES = np.linspace(0.0, 2 * np.pi, CIRCLE_STEPS, endpoint=False)
+_UNIT_CIRCLE = np.stack([np.cos(_ANGLES), np.sin(_ANGLES)], axis=1)
+
+IDENTITY = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+
+
+# =====================================================
+# PARSING HELPERS
+# =====================================================
+
+def _tag(element):
+    """Tag name without the XML namespace."""
+    tag = element.tag
+    return tag[tag.index('}') + 1:] if '}' in tag else tag
+
+
+def _compose(a, b):
+    """Affine 2×3 matrix product a · b (apply b first)."""
+    return np.array([
+        [a[0, 0] * b[0, 0] + a[0, 1] * b[1, 0], a[0, 0] * b[0, 1] + a[0, 1] * b[1, 1],
+         a[0, 0] * b[0, 2] + a[0, 1] * b[1, 2] + a[0, 2]],
+        [a[1, 0] * b[0, 0] + a[1, 1] * b[1, 0], a[1, 0] * b[0, 1] + a[1, 1] * b[1, 1],
+         a[1, 0] * b[0, 2] + a[1, 1] * b[1, 2] + a[1, 2]],
+    ])
+
+
+def parse_transform(text):
+    """Parses translate(...) / scale(...) lists into a 2×3 matrix."""
+    matrix = IDENTITY
+    if not text:
+        return matrix
+
+    for name, args in _TRANSFORM.findall(text):
+        values = [float(v) for v in _NUMBER.findall(args)]
+        if name == "translate":
+            tx = values[0]
+            ty = values[1] if len(values) > 1 else 0.0
+            step = np.array([[1.0, 0.0, tx], [0.0, 1.0, ty]])
+        elif name == "scale":
+            sx = values[0]
+            sy = values[1] if len(values) > 1 else sx
+            step = np.array([[sx, 0.0, 0.0], [0.0, sy, 0.0]])
+        else:
+            raise ValueError(f"Unsupported transform: {name}")
+        matrix = _compose(matrix, step)
+
+    return matrix
+
+
+def parse_color(text):
+    """Returns an (r, g, b) tuple, or None for "none"/missing."""
+    if text is None:
+        return None
+    text = text.strip()
+    if text == "none":
+        return None
+    if text.startswith("rgb"):
+        r, g, b = (int(float(v)) for v in _NUMBER.findall(text))
+        return (r, g, b)
+    if text.startswith("#"):
+        if len(text) == 4:
+            return tuple(int(c * 2, 16) for c in text[1:])
+        return tuple(int(text[i:i + 2], 16) for i in (1, 3, 5))
+    return NAMED_COLORS[text]
+
+
+def parse_path(d):
+    """
+    Flattens an SVG path string into a list of (K, 2) point arrays,
+    one per subpath, in user space.
+    """
+    tokens = _PATH_TOKEN.findall(d)
+    subpaths = []
+    points = []
+    x = y = 0.0
+    start = (0.0, 0.0)
+    cmd = None
+    i = 0
+
+    def flush():
+        if len(points) > 1:
+            subpaths.append(np.array(points))
+
+    while i < len(tokens):
+        token = tokens[i]
+        if token.isalpha():
+            cmd = token
+            i += 1
+            if cmd in "Zz":
+                points.append(start)
+                x, y = start
+                flush()
+                points = []
+                continue
+        elif cmd is None:
+            raise ValueError("Path data must start with a command")
+
+        relative = cmd.islower()
+        op = cmd.upper()
+        ox, oy = (x, y) if relative else (0.0, 0.0)
+
+        if op == "M":
+            flush()
+            x, y = float(tokens[i]) + ox, float(tokens[i + 1]) + oy
+            points = [(x, y)]
+            start = (x, y)
+            i += 2
+            cmd = "l" if relative else "L"   # implicit lineto after moveto
+        elif op == "L":
+            x, y = float(tokens[i]) + ox, float(tokens[i + 1]) + oy
+            points.append((x, y))
+            i += 2
+        elif op == "H":
+            x = float(tokens[i]) + ox
+            points.append((x, y))
+            i += 1
+        elif op == "V":
+            y = float(tokens[i]) + oy
+            points.append((x, y))
+            i += 1
+        elif op == "C":
+            c = [float(t) for t in tokens[i:i + 6]]
+            ctrl = np.array([[x, y], [c[0] + ox, c[1] + oy], [c[2] + ox, c[3] + oy], [c[4] + ox, c[5] + oy]])
+            points.extend((_CUBIC_BASIS @ ctrl).tolist())
+            x, y = ctrl[3]
+            i += 6
+        elif op == "Q":
+            c = [float(t) for t in tokens[i:i + 4]]
+            ctrl = np.array([[x, y], [c[0] + ox, c[1] + oy], [c[2] + ox, c[3] + oy]])
+            points.extend((_QUAD_BASIS @ ctrl).tolist())
+            x, y = ctrl[2]
+            i += 4
+        else:
+            raise ValueError(f"Unsupported path command: {cmd}")
+
+    flush()
+    return subpaths
+
+
+def _apply(matrix, points):
+    return points @ matrix[:, :2].T + matrix[:, 2]
+
+
+# =====================================================
+# SCAN CONVERSION
+# =====================================================
+
+def polygon_edges(shapes):
+    """
+    Edge list of every shape's closed polygons: (starts, ends, counts),
+    starts/ends (E, 2) for all shapes in order, counts[i] the number of
+    edges of shapes[i].  A shape is a list of (K, 2) arrays and/or
+    (M, K, 2) stacks of equal-size polygons (e.g. stroke quads).
+    """
+    blocks = []
+    runs = []       # (vertices per polygon, polygons)
+    counts = []
+    for polygons in shapes:
+        count = 0
+        for poly in polygons:
+            if poly.ndim == 3:
+                blocks.append(poly.reshape(-1, 2))
+                runs.append(poly.shape[1::-1])
+                count += poly.shape[0] * poly.shape[1]
+            elif len(poly) > 2:
+                blocks.append(poly)
+                runs.append((len(poly), 1))
+                count += len(poly)
+        counts.append(count)
+
+    if not blocks:
+        empty = np.empty((0, 2))
+        return empty, empty, counts
+
+    # Every vertex is followed by the next one of its polygon, the last
+    # one by the first
+    starts = np.concatenate(blocks)
+    sizes, repeats = np.array(runs).T
+    lengths = np.repeat(sizes, repeats)
+    last = np.cumsum(lengths) - 1
+    following = np.arange(1, len(starts) + 1)
+    following[last] = last - lengths + 1
+    return starts, starts[following], counts
+
+
+def fill_coverage(polygons, width, height, supersample=DEFAULT_SUPERSAMPLE):
+    """
+    Nonzero-winding coverage of closed polygons (pixel coordinates);
+    see polygon_edges() for the accepted shapes.
+
+    Returns (coverage, x0, y0): a float32 array for the pixel box starting
+    at (x0, y0), or (None, 0, 0) when nothing is on the canvas.
+    """
+    return fill_coverages([polygons], width, height, supersample)[0]
+
+
+def fill_coverages(shapes, width, height, supersample=DEFAULT_SUPERSAMPLE):
+    """
+    fill_coverage() for many shapes in one pass: every shape keeps its own
+    nonzero winding and bounding box, but the crossings of all of them are
+    accumulated with one bincount and integrated together.
+
+    shapes: list of polygon lists, one per shape
+    Returns a list of (coverage, x0, y0), one per shape.
+    """
+    ss = supersample
+    results = [(None, 0, 0)] * len(shapes)
+    starts, ends, counts = polygon_edges(shapes)
+    counts = np.array(counts)
+    drawn = np.flatnonzero(counts)
+    if not len(drawn):
+        return results
+
+    # Pixel bounding boxes, clipped to the canvas
+    offsets = (np.cumsum(counts) - counts)[drawn]
+    low = np.floor(np.minimum.reduceat(starts, offsets)).astype(np.int64)
+    high = np.ceil(np.maximum.reduceat(starts, offsets)).astype(np.int64)
+    x0 = np.maximum(low[:, 0], 0)
+    y0 = np.maximum(low[:, 1], 0)
+    x1 = np.minimum(high[:, 0], width)
+    y1 = np.minimum(high[:, 1], height)
+    visible = (x1 > x0) & (y1 > y0)
+    if not visible.any():
+        return results
+    drawn, x0, y0, x1, y1 = drawn[visible], x0[visible], y0[visible], x1[visible], y1[visible]
+
+    # Shapes are stacked vertically in one accumulator, each in its own
+    # band of sample rows, all with the width of the widest box
+    box_of = np.full(len(shapes), -1)
+    box_of[drawn] = np.arange(len(drawn))
+    owner = np.repeat(box_of, counts)
+    cols = x1 - x0
+    heights = (y1 - y0) * ss
+    bands = np.concatenate([[0], np.cumsum(heights)])
+    tops = bands[:-1] // ss
+    stride = int(cols.max()) + 2
+
+    # Edges in local space: x in pixels, y in sample rows.
+    # Horizontal edges and edges of shapes off the canvas never count.
+    keep = (owner >= 0) & (starts[:, 1] != ends[:, 1])
+    owner = owner[keep]
+    ax = starts[keep, 0] - x0[owner]
+    ay = (starts[keep, 1] - y0[owner]) * ss
+    bx = ends[keep, 0] - x0[owner]
+    by = (ends[keep, 1] - y0[owner]) * ss
+
+    direction = np.where(by > ay, 1.0, -1.0)
+    slope = (bx - ax) / (by - ay)
+
+    # A crossing counts for sample rows whose center yc = r + 0.5 has
+    # lo <= yc < hi: rows ceil(lo - 0.5) … ceil(hi - 0.5) - 1, kept
+    # inside the shape's band
+    lo = np.clip(np.ceil(np.minimum(ay, by) - 0.5), 0, heights[owner]).astype(np.int64)
+    hi = np.clip(np.ceil(np.maximum(ay, by) - 0.5), 0, heights[owner]).astype(np.int64)
+    n = hi - lo
+    e = np.repeat(np.arange(len(n)), n)
+    r = lo[e] + np.arange(len(e)) - np.repeat(np.cumsum(n) - n, n)
+
+    xs = np.clip(ax[e] + (r + 0.5 - ay[e]) * slope[e], 0, cols[owner[e]])
+
+    # Exact horizontal coverage: a crossing at x covers (1 - frac) of its
+    # own pixel and all of the following ones.  The accumulator is stored
+    # column-major, so integrating along x is one vector add per column,
+    # and sample row r of a band is pixel row top + r // ss of sample
+    # plane r % ss, so averaging the planes is a contiguous sum.
+    xi = xs.astype(np.int64)
+    frac = xs - xi
+    d = direction[e]
+    total_rows = int(bands[-1])
+    rows = total_rows // ss
+    flat = xi * total_rows + (r % ss) * rows + tops[owner[e]] + r // ss
+    acc = np.bincount(np.concatenate([flat, flat + total_rows]),
+                      weights=np.concatenate([d * (1 - frac), d * frac]),
+                      minlength=stride * total_rows).reshape(stride, ss, rows)
+
+    for x in range(1, stride):
+        np.add(acc[x - 1], acc[x], out=acc[x])
+    np.abs(acc, out=acc)
+    np.minimum(acc, 1.0, out=acc)
+    pixels = acc.sum(axis=1, dtype=np.float32)
+    pixels *= 1.0 / ss
+    pixels = np.ascontiguousarray(pixels.T)
+
+    for index, top, h, w, left, upper in zip(drawn, tops, y1 - y0, cols, x0, y0):
+        results[index] = (pixels[top:top + h, :w], int(left), int(upper))
+    return results
+
+
+def stroke_polygons(polylines, half_width, round_ends=False):
+    """
+    Converts polylines (a (K, 2) array or a list of them) to quads, one
+    per segment, of the given half width, all with the same orientation
+    so their nonzero union is the stroke.
+    Round caps/joins are discs at every vertex, wound the same way as the
+    quads; opposite windings would cancel to zero where they overlap.
+    They are left out of strokes up to ROUND_JOIN_MIN_WIDTH wide.
+    Returns a list of polygon stacks for fill_coverage().
+    """
+    if isinstance(polylines, np.ndarray):
+        polylines = [polylines]
+    points = np.concatenate(polylines)
+    p0 = points[:-1]
+    p1 = points[1:]
+    d = p1 - p0
+    length = np.hypot(d[:, 0], d[:, 1])
+    keep = length > 1e-12
+    # No segment from the end of one polyline to the start of the next
+    keep[np.cumsum([len(polyline) for polyline in polylines[:-1]], dtype=np.int64) - 1] = False
+    p0, p1, d, length = p0[keep], p1[keep], d[keep], length[keep]
+
+    n = np.stack([-d[:, 1], d[:, 0]], axis=1) * (half_width / length)[:, None]
+    polys = [np.stack([p0 + n, p1 + n, p1 - n, p0 - n], axis=1)]
+
+    if round_ends and 2 * half_width > ROUND_JOIN_MIN_WIDTH and len(points):
+        # Quads run clockwise (y down: p0+n → p1+n → p1-n), so the disc does too
+        disc = _UNIT_CIRCLE[::-4] * half_width
+        polys.append(points[:, None, :] + disc)
+
+    return polys
+
+
+def stroke_width(matrix, width, supersample=DEFAULT_SUPERSAMPLE):
+    """
+    (pixel width, opacity) of a stroke `width` user units wide drawn
+    through `matrix`.  Non-uniform scales use the geometric mean.
+    Hairlines thinner than one sample are widened to one sample and faded
+    proportionally, so they neither vanish nor alias.
+    """
+    scale = abs(matrix[0, 0] * matrix[1, 1] - matrix[0, 1] * matrix[1, 0]) ** 0.5
+    width *= scale
+    if width <= 0:
+        return 0.0, 0.0
+    min_width = 1.0 / supersample
+    return max(width, min_width), min(1.0, width / min_width)
+
+
+# =====================================================
+# CANVAS
+# =====================================================
+
+class Canvas:
+    """
+    RGBA float canvas with source-over compositing.
+    Colour is stored premultiplied by alpha as planes (3, height, width),
+    so blending a coverage box is two multiply-adds over contiguous rows
+    of every channel; to_rgba() converts back to straight alpha.
+    """
+
+    def __init__(self, width, height, background=None, supersample=DEFAULT_SUPERSAMPLE):
+        self.width = width
+        self.height = height
+        self.supersample = supersample
+        self.rgb = np.zeros((3, height, width), dtype=np.float32)
+        self.alpha = np.zeros((height, width), dtype=np.float32)
+        if background is not None:
+            self.rgb[:] = np.reshape(background, (3, 1, 1))
+            self.alpha[:] = 1.0
+
+    def coverage(self, polygons):
+        return fill_coverage(polygons, self.width, self.height, self.supersample)
+
+    def paint(self, coverage, x0, y0, color, clip=None):
+        """Composites `color` with per-pixel alpha `coverage` at (x0, y0)."""
+        if coverage is None:
+            return
+        h, w = coverage.shape
+        if clip is not None:
+            coverage = coverage * clip[y0:y0 + h, x0:x0 + w]
+
+        rgb = self.rgb[:, y0:y0 + h, x0:x0 + w]
+        alpha = self.alpha[y0:y0 + h, x0:x0 + w]
+
+        # Premultiplied: dst = dst * (1 - coverage) + color * coverage
+        remaining = 1 - coverage
+        rgb *= remaining
+        rgb += np.multiply.outer(np.asarray(color, dtype=np.float32), coverage)
+        alpha *= remaining
+        alpha += coverage
+
+    def full_coverage(self, polygons):
+        """Coverage of polygons as a full-canvas array (for clip masks)."""
+        mask = np.zeros((self.height, self.width), dtype=np.float32)
+        coverage, x0, y0 = self.coverage(polygons)
+        if coverage is not None:
+            h, w = coverage.shape
+            mask[y0:y0 + h, x0:x0 + w] = coverage
+        return mask
+
+    def to_rgba(self):
+        """(height, width, 4) uint8 array."""
+        out = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        # Premultiplied colour is 0 wherever alpha is
+        rgb = self.rgb / np.maximum(self.alpha, np.finfo(np.float32).tiny)
+        rgb += 0.5
+        out[:, :, :3] = np.minimum(rgb, 255).transpose(1, 2, 0)
+        out[:, :, 3] = self.alpha * 255 + 0.5
+        return out
+
+
+# =====================================================
+# SVG WALKER
+# =====================================================
+
+def _declarations(text):
+    """ "a:b;c:d" → {"a": "b", "c": "d"} """
+    props = {}
+    for item in text.split(";"):
+        name, _, value = item.partition(":")
+        if value:
+            props[name.strip()] = value.strip()
+    return props
+
+
+class _Renderer:
+
+    def __init__(self, root, canvas):
+        self.canvas = canvas
+        self.ids = {}
+        self.classes = {}
+        self.clip_cache = {}
+        for element in root.iter():
+            element_id = element.get("id")
+            if element_id is not None:
+                self.ids[element_id] = element
+            if _tag(element) == "style":
+                for name, body in _CLASS_RULE.findall(element.text or ""):
+                    self.classes.setdefault(name, {}).update(_declarations(body))
+
+    def style(self, element, inherited):
+        """
+        Effective properties: inherited, then presentation attributes,
+        then class rules, then the style attribute (CSS precedence).
+        """
+        props = dict(inherited)
+        for name in INHERITED:
+            value = element.get(name)
+            if value is not None:
+                props[name] = value
+        for name in (element.get("class") or "").split():
+            props.update(self.classes.get(name, ()))
+        style = element.get("style")
+        if style:
+            props.update(_declarations(style))
+        return props
+
+    def render(self, element, matrix, inherited={}, clip=None):
+        tag = _tag(element)
+
+        if tag in ("defs", "clipPath", "style"):
+            return
+
+        props = self.style(element, inherited)
+        if props.get("display") == "none":
+            return
+        props.pop("display", None)
+
+        matrix = _compose(matrix, parse_transform(element.get("transform")))
+
+        if tag in ("svg", "g", "use"):
+            group_clip = self.clip_mask(element, matrix)
+            if group_clip is not None:
+                clip = group_clip if clip is None else clip * group_clip
+
+            if tag == "use":
+                ref = element.get("href") or element.get("{http://www.w3.org/1999/xlink}href")
+                self.render(self.ids[ref.lstrip("#")], matrix, props, clip)
+            else:
+                for child in element:
+                    self.render(child, matrix, props, clip)
+        elif tag in ("path", "circle", "polygon"):
+            self.draw_shape(element, tag, matrix, props, clip)
+
+    def outline(self, element, tag, matrix):
+        """Shape geometry in pixel space, as a list of point arrays."""
+        if tag == "path":
+            subpaths = parse_path(element.get("d"))
+        elif tag == "circle":
+            cx, cy, r = (float(element.get(k)) for k in ("cx", "cy", "r"))
+            subpaths = [_UNIT_CIRCLE * r + (cx, cy)]
+        else:
+            values = [float(v) for v in _NUMBER.findall(element.get("points"))]
+            subpaths = [np.array(values).reshape(-1, 2)]
+        return [_apply(matrix, points) for points in subpaths]
+
+    def clip_mask(self, element, matrix):
+        clip_ref = element.get("clip-path")
+        if not clip_ref:
+            return None
+
+        clip_id = _URL_REF.search(clip_ref).group(1)
+        key = (clip_id, matrix.tobytes())
+        if key not in self.clip_cache:
+            polygons = []
+            for child in self.ids[clip_id]:
+                if _tag(child) in ("path", "circle", "polygon"):
+                    polygons.extend(self.outline(child, _tag(child), matrix))
+            self.clip_cache[key] = self.canvas.full_coverage(polygons)
+        return self.clip_cache[key]
+
+    def draw_shape(self, element, tag, matrix, props, clip):
+        polygons = self.outline(element, tag, matrix)
+        shape_clip = self.clip_mask(element, matrix)
+        if shape_clip is not None:
+            clip = shape_clip if clip is None else clip * shape_clip
+
+        fill = parse_color(props.get("fill", "black"))
+        if fill is not None:
+            coverage, x0, y0 = self.canvas.coverage(polygons)
+            self.canvas.paint(coverage, x0, y0, fill, clip)
+
+        stroke = parse_color(props.get("stroke"))
+        if stroke is not None:
+            self.draw_stroke(props, polygons, matrix, stroke, clip)
+
+    def draw_stroke(self, props, polygons, matrix, color, clip):
+        width, opacity = stroke_width(matrix, float(props.get("stroke-width", 1)),
+                                      self.canvas.supersample)
+        if width <= 0 or not polygons:
+            return
+
+        round_ends = "round" in (props.get("stroke-linecap", "") + props.get("stroke-linejoin", ""))
+        coverage, x0, y0 = self.canvas.coverage(stroke_polygons(polygons, width / 2, round_ends))
+        if coverage is not None and opacity < 1.0:
+            coverage = coverage * opacity
+        self.canvas.paint(coverage, x0, y0, color, clip)
+
+
+def rasterize_svg(svg, width=128, height=160, background=None,
+                  supersample=DEFAULT_SUPERSAMPLE):
+    """
+    Renders an SVG document (as produced by generate_face_svg) to a
+    (height, width, 4) uint8 RGBA array.  The viewBox is fitted
+    centred and aspect-preserving (xMidYMid meet).
+
+    background: None for transparent, or an (r, g, b) tuple.
+    """
+    root = ET.fromstring(svg.strip())
+    canvas = Canvas(width, height, background, supersample)
+
+    view_box = root.get("viewBox")
+    if view_box:
+        view_box = [float(v) for v in _NUMBER.findall(view_box)]
+    else:
+        view_box = (0.0, 0.0, float(width), float(height))
+
+    _Renderer(root, canvas).render(root, fit_view_box(view_box, width, height))
+    return canvas.to_rgba()
+
+
+def fit_view_box(view_box, width, height):
+    """Matrix fitting view_box (x, y, w, h) centred into width × height (xMidYMid meet)."""
+    vx, vy, vw, vh = view_box
+    scale = min(width / vw, height / vh)
+    tx = (width - vw * scale) / 2 - vx * scale
+    ty = (height - vh * scale) / 2 - vy * scale
+    return np.array([[scale, 0.0, tx], [0.0, scale, ty]])
+
+
+# =====================================================
+# PART GEOMETRY
+# =====================================================
+#
+# The fast path for thumbnails: the part classes hand over their shapes
+# (see shape()) and no SVG text is formatted or parsed.  Outlines are
+# paths.Path objects or (K, 2) point sequences in the part's own space;
+# render_shapes() places them with per-part matrices.
+#
+# Per face, every path is flattened in one matrix product, and the
+# coverage of every fill, stroke and clip is computed in one
+# fill_coverages() pass; only compositing runs shape by shape.
+
+def shape(outlines, fill=None, stroke=None, stroke_width=0.0, round_joins=False, clip=None):
+    """
+    One drawable shape, as consumed by render_shapes().
+
+    outlines     : list of paths.Path or (K, 2) point sequences (polygons)
+    fill, stroke : (r, g, b) or None
+    round_joins  : round caps and joins (stroke-linecap/linejoin="round")
+    clip         : optional list of outlines the shape is clipped to
+    """
+    return dict(outlines=outlines, fill=fill, stroke=stroke, stroke_width=stroke_width,
+                round_joins=round_joins, clip=clip)
+
+
+def circle_outline(cx, cy, r):
+    """Polygon approximating a circle, for shape()."""
+    return _UNIT_CIRCLE * r + (cx, cy)
+
+
+def affine(tx=0.0, ty=0.0, sx=1.0, sy=None):
+    """Matrix of translate(tx, ty) scale(sx, sy)."""
+    sy = sx if sy is None else sy
+    return np.array([[sx, 0.0, tx], [0.0, sy, ty]])
+
+
+def flatten_paths(paths):
+    """
+    Flattens paths.Path objects into polylines.
+    Returns one list of (K, 2) arrays (one per subpath) for each path.
+
+    Lines are copied as they are; every curve of every path goes through a
+    single Bezier evaluation (quadratics raised to cubics).
+    """
+    line_slots, line_points = [], []
+    curve_slots, curves = [], []
+    bounds = []
+    n = 0
+
+    for path in paths:
+        subpaths = []
+        coords = path.coords
+        x = y = sx = sy = 0.0
+        first = n
+        i = 0
+
+        for code in path.commands:
+            if code == "M":
+                if n - first > 1:
+                    subpaths.append((first, n))
+                x, y = sx, sy = coords[i], coords[i + 1]
+                first = n
+                line_slots.append(n)
+                line_points.append((x, y))
+                n += 1
+                i += 2
+            elif code == "L":
+                x, y = coords[i], coords[i + 1]
+                line_slots.append(n)
+                line_points.append((x, y))
+                n += 1
+                i += 2
+            elif code == "C":
+                c1x, c1y, c2x, c2y, ex, ey = coords[i:i + 6]
+                curve_slots.append(n)
+                curves.append((x, y, c1x, c1y, c2x, c2y, ex, ey))
+                x, y = ex, ey
+                n += CURVE_STEPS
+                i += 6
+            elif code == "Q":
+                qx, qy, ex, ey = coords[i:i + 4]
+                curve_slots.append(n)
+                curves.append((x, y, x + (qx - x) * 2 / 3, y + (qy - y) * 2 / 3,
+                               ex + (qx - ex) * 2 / 3, ey + (qy - ey) * 2 / 3, ex, ey))
+                x, y = ex, ey
+                n += CURVE_STEPS
+                i += 4
+            else:
+                x, y = sx, sy
+                line_slots.append(n)
+                line_points.append((x, y))
+                n += 1
+                if n - first > 1:
+                    subpaths.append((first, n))
+                first = n
+
+        if n - first > 1:
+            subpaths.append((first, n))
+        bounds.append(subpaths)
+
+    points = np.empty((n, 2))
+    if line_slots:
+        points[line_slots] = line_points
+    if curve_slots:
+        slots = np.add.outer(curve_slots, np.arange(CURVE_STEPS))
+        points[slots] = _CUBIC_BASIS @ np.array(curves).reshape(-1, 4, 2)
+
+    return [[points[a:b] for a, b in subpaths] for subpaths in bounds]
+
+
+def render_shapes(placed, width=128, height=160, view_box=None, background=None,
+                  supersample=DEFAULT_SUPERSAMPLE):
+    """
+    Renders part geometry to a (height, width, 4) uint8 RGBA array.
+
+    placed   : list of (matrix, shape) in paint order; matrix (see affine())
+               maps the shape's outlines into view_box units
+    view_box : (x, y, w, h) fitted as in rasterize_svg(); default the canvas
+    """
+    canvas = Canvas(width, height, background, supersample)
+    if view_box is None:
+        view_box = (0.0, 0.0, float(width), float(height))
+    fit = fit_view_box(view_box, width, height)
+
+    # Flatten every distinct Path once, however often it is placed
+    paths = {}
+    for _, item in placed:
+        for outline in item['outlines'] + (item['clip'] or []):
+            if isinstance(outline, Path):
+                paths.setdefault(id(outline), outline)
+    flat = dict(zip(paths, flatten_paths(list(paths.values()))))
+
+    def pixels(outlines, matrix):
+        polylines = []
+        for outline in outlines:
+            polylines.extend(flat[id(outline)] if isinstance(outline, Path) else [np.asarray(outline)])
+        return [_apply(matrix, points) for points in polylines]
+
+    entries = []    # polygon lists for fill_coverages()
+    steps = []      # (entry, color, opacity, clip entry), in paint order
+    clips = {}
+
+    for matrix, item in placed:
+        matrix = _compose(fit, matrix)
+        polylines = pixels(item['outlines'], matrix)
+
+        clip = None
+        if item['clip'] is not None:
+            key = (id(item['clip']), matrix.tobytes())
+            if key not in clips:
+                clips[key] = len(entries)
+                entries.append(pixels(item['clip'], matrix))
+            clip = clips[key]
+
+        if item['fill'] is not None:
+            steps.append((len(entries), item['fill'], 1.0, clip))
+            entries.append(polylines)
+
+        if item['stroke'] is not None:
+            line_width, opacity = stroke_width(matrix, item['stroke_width'], supersample)
+            if line_width > 0 and polylines:
+                steps.append((len(entries), item['stroke'], opacity, clip))
+                entries.append(stroke_polygons(polylines, line_width / 2, item['round_joins']))
+
+    coverages = fill_coverages(entries, width, height, supersample)
+
+    masks = {}
+    for entry, color, opacity, clip in steps:
+        coverage, x0, y0 = coverages[entry]
+        if coverage is not None and opacity < 1.0:
+            coverage = coverage * opacity
+        mask = None
+        if clip is not None:
+            if clip not in masks:
+                mask = masks[clip] = np.zeros((height, width), dtype=np.float32)
+                clip_coverage, cx0, cy0 = coverages[clip]
+                if clip_coverage is not None:
+                    h, w = clip_coverage.shape
+                    mask[cy0:cy0 + h, cx0:cx0 + w] = clip_coverage
+            mask = masks[clip]
+        canvas.paint(coverage, x0, y0, color, mask)
+
+    return canvas.to_rgba()
+
+
+# =====================================================
+# PNG ENCODING
+# =====================================================
+
+def _png_chunk(kind, data):
+    return (struct.pack(">I", len(data)) + kind + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+
+def encode_png(rgba, compression=6):
+    """Encodes an (H, W, 4) uint8 array as PNG bytes (stdlib zlib only)."""
+    height, width = rgba.shape[:2]
+
+    # Filter type 0 (None) byte in front of every scanline
+    raw = np.empty((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n"
+            + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), compression))
+            + _png_chunk(b"IEND", b""))
+
+
+def svg_to_png(svg, width=128, height=160, background=None):
+    """rasterize_svg() followed by encode_png()."""
+    return encode_png(rasterize_svg(svg, width, height, background))
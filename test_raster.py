@@ -0,0 +1,34 @@
+import numpy as np
+
+from raster import fill_coverage, stroke_polygons
+
+
+def _stroke_coverage(polyline, half_width, round_ends, width=80, height=60):
+    coverage, x0, y0 = fill_coverage(stroke_polygons(polyline, half_width, round_ends), width, height)
+    full = np.zeros((height, width), dtype=np.float32)
+    h, w = coverage.shape
+    full[y0:y0 + h, x0:x0 + w] = coverage
+    return full
+
+
+def test_round_caps_extend_the_stroke():
+    # Discs at the vertices must add to the quads, never cancel them
+    for polyline in (np.array([[10.0, 20.0], [50.0, 20.0]]),
+                     np.array([[10.0, 10.0], [40.0, 30.0], [70.0, 12.0]]),
+                     np.array([[60.0, 50.0], [15.0, 45.0]])):
+        butt = _stroke_coverage(polyline, 3.0, False)
+        capped = _stroke_coverage(polyline, 3.0, True)
+        assert (capped >= butt - 1e-6).all()
+        assert capped.sum() > butt.sum()
+
+
+def test_part_geometry_renders_like_the_svg():
+    # The thumbnail path skips the SVG; only stroke overlaps may differ
+    from TenderFace import _new_genome, generate_face_svg, render_face_rgba
+    from raster import rasterize_svg
+
+    for seed in range(5):
+        genome = _new_genome(seed)
+        direct = render_face_rgba(genome=genome).astype(int)
+        parsed = rasterize_svg(generate_face_svg(str(seed), genome=genome)).astype(int)
+        assert np.abs(direct - parsed).mean() < 0.1